@@ -12,8 +12,24 @@ graphs for our program levels 1 and 2.
 This file is copyright (c) 2021 Michele Massa, Nischal Nair and Nathan Zavys-Cox.
 """
 from __future__ import annotations
-from typing import Optional
+from typing import Any, Optional
+from collections import deque
 import csv
+import heapq
+import itertools
+import math
+
+
+#############
+# CONSTANTS #
+#############
+
+# search engines available to the grid graphs, mapped to the names shown to the user
+SEARCH_ENGINES = {'bfs': 'BFS', 'a_star': 'A*', 'bidirectional': 'Bidirectional BFS',
+                  'flow_field': 'Flow Field'}
+
+# the number of end vertices a graph keeps a distance field for
+FLOW_FIELD_CACHE_SIZE = 4
 
 
 ###########
@@ -38,20 +54,44 @@ class Vertex:
     """
     pos: tuple[int, int]
     neighbours: set[Vertex]
-    state: Optional[str]  # 'start', 'end', 'blocked', 'path', none means normal
+    # Private Instance Attributes:
+    #   - _state: the value behind the state property
+    #   - _graph: the graph this vertex belongs to, which is told about every state change
+    _state: Optional[str]  # 'start', 'end', 'blocked', 'path', none means normal
+    _graph: Optional[Graph]
 
     def __init__(self, position: tuple[int, int], neighbours: set[Vertex],
-                 state: Optional[str] = None) -> None:
+                 state: Optional[str] = None, graph: Optional[Graph] = None) -> None:
         """ Initialize a new vertex with the given item and neighbours.
         """
         self.pos = position
         self.neighbours = neighbours
-        self.state = state
+        self._state = state
+        self._graph = graph
+
+    @property
+    def state(self) -> Optional[str]:
+        """ The state of this vertex: 'start', 'end', 'blocked', 'path' or None.
+        """
+        return self._state
 
-    def check_connected(self, target_pos: tuple[int, int], visited: set[Vertex]) -> bool:
+    @state.setter
+    def state(self, new_state: Optional[str]) -> None:
+        """ Change the state of this vertex, letting the graph it belongs to know about it.
+        """
+        old_state, self._state = self._state, new_state
+        if self._graph is not None:
+            self._graph.record_state_change(self.pos, old_state, new_state)
+
+    def check_connected(self, target_pos: tuple[int, int], visited: set[Vertex],
+                        stop_early: bool = True) -> bool:
         """ Return whether this vertex is connected to a vertex corresponding to the target_item,
         WITHOUT using any of the vertices in visited.
 
+        Every vertex explored is added to visited. If stop_early is False the exploration
+        carries on after the target has been found, so that visited ends up holding every
+        vertex connected to this one.
+
         Preconditions:
             - self not in visited
 
@@ -68,19 +108,7 @@ class Vertex:
         >>> v1.check_connected((0, 3), set())
         False
         """
-        if self.pos == target_pos:
-            # Our base case: the target_item is the current vertex
-            return True
-        # In case the stating vertex is a blocked vertex
-        else:
-            visited.add(self)  # Add self to the set of visited vertices
-            for u in self.neighbours:
-                # Don't recurse to visited or blocked vertices.
-                if u not in visited and u.state != "blocked":
-                    if u.check_connected(target_pos, visited):
-                        return True
-
-            return False
+        return explore_connected(self, target_pos, visited, stop_early)
 
 
 class Graph:
@@ -91,13 +119,36 @@ class Graph:
     Instance Attributes:
       - vertices: A dictionary mapping vertex positions on the screen/grid to their
       vertex objects.
+      - version: int incremented whenever a change that can affect a search happens, i.e.
+      a vertex or edge is added, or a vertex becomes (or stops being) blocked.
     """
     vertices: dict[tuple[float, float], Vertex]
+    version: int
+    # Private Instance Attributes:
+    #   - _component_labels: maps the position of every vertex that is not blocked to the
+    #   label of its connected component, as computed by component_labels.
+    #   - _components_version: the version of the graph _component_labels was computed for.
+    #   - _flow_fields: maps end positions to their distance field, as computed by
+    #   distance_field, in the order they were computed.
+    #   - _flow_fields_version: the version of the graph _flow_fields were computed for.
+    #   - _state_changes: the positions of the vertices added, or whose state changed, since
+    #   the last call to take_state_changes.
+    _component_labels: dict[tuple[int, int], int]
+    _components_version: int
+    _flow_fields: dict[tuple[int, int], Any]
+    _flow_fields_version: int
+    _state_changes: set[tuple[int, int]]
 
     def __init__(self) -> None:
         """Initialize an empty graph (no vertices or edges).
         """
         self.vertices = {}
+        self.version = 0
+        self._component_labels = {}
+        self._components_version = -1
+        self._flow_fields = {}
+        self._flow_fields_version = -1
+        self._state_changes = set()
 
     def add_vertex(self, position: tuple[int, int], state: Optional[str] = None) -> None:
         """ Add a vertex with the given position to this graph, and a state, which
@@ -108,7 +159,9 @@ class Graph:
         Preconditions
           - state in {'blocked', 'start', 'end', 'path'} or state is None
         """
-        self.vertices[position] = Vertex(position, set(), state)
+        self.vertices[position] = Vertex(position, set(), state, self)
+        self.version += 1
+        self._state_changes.add(position)
 
     def add_edge(self, pos1: tuple[float, float], pos2: tuple[float, float]) -> None:
         """ Add an edge between the two vertices with the given items in this graph.
@@ -125,67 +178,357 @@ class Graph:
             # Add the new edge
             v1.neighbours.add(v2)
             v2.neighbours.add(v1)
+            self.version += 1
         else:
             # We didn't find an existing vertex for both items.
             raise ValueError
 
+    def record_state_change(self, pos: tuple[int, int], old_state: Optional[str],
+                            new_state: Optional[str]) -> None:
+        """ Record that the state of the vertex at pos went from old_state to new_state.
+        Only changes to or from 'blocked' can affect a search, so only those change the
+        version of this graph (and make the component labels out of date), but every change
+        is kept for take_state_changes.
+        """
+        if (old_state == 'blocked') != (new_state == 'blocked'):
+            self.version += 1
+        self._state_changes.add(pos)
+
+    def take_state_changes(self) -> set[tuple[int, int]]:
+        """ Return the positions of the vertices that were added, or whose state changed,
+        since the last call to this method (or since this graph was created), and start
+        recording changes afresh. This lets a drawing of the graph only update those vertices.
+
+        >>> g = create_blank_graph(2, 1)
+        >>> g.take_state_changes() == {(0, 0), (1, 0)}
+        True
+        >>> g.vertices[(1, 0)].state = 'path'
+        >>> g.take_state_changes()
+        {(1, 0)}
+        >>> g.take_state_changes()
+        set()
+        """
+        changes, self._state_changes = self._state_changes, set()
+        return changes
+
     def connected(self, pos1: tuple[int, int], pos2: tuple[int, int]) -> bool:
-        """ Return whether item1 and item2 are connected vertices in this graph.
+        """ Return whether item1 and item2 are connected vertices in this graph, through
+        vertices that are not blocked. Neither vertex can be blocked itself, unless they are
+        the same vertex.
 
         Return False if item1 or item2 do not appear as vertices in this graph.
+
+        The answer is a comparison of the component labels of the two vertices, which are
+        only recomputed after a vertex has been blocked or unblocked.
+
+        >>> g = create_blank_graph(3, 1)
+        >>> g.connected((0, 0), (2, 0))
+        True
+        >>> g.vertices[(1, 0)].state = 'blocked'
+        >>> g.connected((0, 0), (2, 0))
+        False
         """
         if pos1 in self.vertices and pos2 in self.vertices:
-            v1 = self.vertices[pos1]
-            return v1.check_connected(pos2, set())  # Pass in an empty "visited" set
+            if pos1 == pos2:
+                return True
+            labels = self.component_labels()
+            return pos1 in labels and labels.get(pos2) == labels[pos1]
         else:
             return False
 
+    def component_labels(self) -> dict[tuple[int, int], int]:
+        """ Return a dictionary mapping the position of every vertex that is not blocked to
+        the label of its connected component: two such vertices are connected if and only if
+        their labels are equal.
+
+        The labels are computed with a single sweep over the graph, and kept until the
+        version of the graph changes.
+        """
+        if self._components_version != self.version:
+            labels = {}
+            for pos, vertex in self.vertices.items():
+                if pos not in labels and vertex.state != 'blocked':
+                    component = set()
+                    explore_connected(vertex, pos, component, stop_early=False)
+                    label = len(labels)  # any label not given to a previous component
+                    for u in component:
+                        labels[u.pos] = label
+
+            self._component_labels = labels
+            self._components_version = self.version
+
+        return self._component_labels
+
     def breadth_first_search(self, start_pos: tuple, end_pos: tuple) -> Optional[list]:
         """ Returns the shortest path between two vertexes, if there exists such a path.
         Return None if no such path exists. This method uses the Breadth First Search
         algorithm to find the shortest path between two vertexes. The returned path contains
         only vertices between start and end, and also does NOT contain any blocked vertices.
 
+        The search uses a FIFO queue of positions and records a single predecessor for every
+        vertex it reaches, so the path is only rebuilt once the end vertex has been found.
+
         Preconditions
           - self.connected(start_pos, end_pos)
+
+        >>> g = create_blank_graph(3, 1)
+        >>> g.breadth_first_search((0, 0), (2, 0))
+        [(1, 0)]
+        >>> g.vertices[(1, 0)].state = 'blocked'
+        >>> g.breadth_first_search((0, 0), (2, 0)) is None
+        True
         """
-        # Extracting the star and end point vertices
-        start = self.vertices[start_pos]
-        end = self.vertices[end_pos]
+        if start_pos == end_pos:
+            return []
+
+        # parents maps every reached position to the position it was first reached from,
+        # which doubles as the set of explored vertices
+        parents = {start_pos: None}
+        que = deque([start_pos])
 
-        # explored is a set that keep track of 'visited' vertices
-        explored = set()
-        que = [[start]]
+        # Run the breadth first search algorithm, never expanding blocked vertices
+        while que:
+            pos = que.popleft()
 
-        # pre-add any blocked vertices to explored, so that we don't call them later on
-        for u in self.vertices:
-            if self.vertices[u].state == "blocked":
-                explored.add(u)
+            for neighbour in self._open_neighbours(pos):
+                if neighbour not in parents:
+                    parents[neighbour] = pos
 
-        # Run the breadth first search algorithm, slightly modified to not count blocked vertices
-        while que != []:
-            path = que.pop(0)
-            node = path[-1]
+                    if neighbour == end_pos:
+                        return rebuild_path(parents, end_pos)[1:-1]
 
-            if node not in explored:
-                neighbours = self.vertices[node.pos].neighbours
+                    que.append(neighbour)
 
-                for neighbour in neighbours:
+        # In case the early return has not occurred, meaning that there exists no valid path
+        return None
 
-                    # checking that we don't traverse into any blocked vertices
-                    if neighbour.state != "blocked":
-                        new_path = list(path)
-                        new_path.append(neighbour)
-                        que.append(new_path)
+    def a_star_search(self, start_pos: tuple, end_pos: tuple) -> Optional[list]:
+        """ Returns the shortest path between two vertexes, if there exists such a path, in the
+        same format as breadth_first_search (only the vertices between start and end, never
+        any blocked vertices). Return None if no such path exists.
 
-                        if neighbour == end:
-                            return [v.pos for v in new_path][1:-1]
+        This method uses the A* algorithm: vertices are expanded in order of their distance
+        from the start plus the Manhattan distance from their position to the end position.
+        As every edge of our grids joins two orthogonally adjacent cells with a unit weight,
+        this estimate never overestimates the real distance, so the path found is a shortest
+        one. Ties are broken in favour of the vertex closest to the end, which makes the
+        search head straight for the goal whenever nothing is in the way.
 
-                explored.add(node)
+        Preconditions
+          - self.connected(start_pos, end_pos)
 
-        # In case the early return has not occurred, meaning that there exists no valid path
+        >>> g = create_blank_graph(4, 3)
+        >>> g.a_star_search((0, 0), (3, 0))
+        [(1, 0), (2, 0)]
+        >>> g.vertices[(1, 0)].state = 'blocked'
+        >>> len(g.a_star_search((0, 0), (3, 0)))
+        4
+        """
+        if start_pos == end_pos:
+            return []
+
+        # heap entries are (estimated total, estimated remaining, tie breaker, position)
+        counter = itertools.count()
+        start_estimate = manhattan_distance(start_pos, end_pos)
+        heap = [(start_estimate, start_estimate, next(counter), start_pos)]
+        dist = {start_pos: 0}
+        parents = {start_pos: None}
+        expanded = set()
+
+        while heap:
+            _, _, _, pos = heapq.heappop(heap)
+            if pos == end_pos:
+                return rebuild_path(parents, end_pos)[1:-1]
+            if pos in expanded:
+                continue  # stale entry, the vertex was already expanded through a shorter path
+            expanded.add(pos)
+
+            new_dist = dist[pos] + 1
+            for neighbour in self._open_neighbours(pos):
+                if new_dist < dist.get(neighbour, math.inf):
+                    dist[neighbour] = new_dist
+                    parents[neighbour] = pos
+                    remaining = manhattan_distance(neighbour, end_pos)
+                    heapq.heappush(heap, (new_dist + remaining, remaining, next(counter),
+                                          neighbour))
+
+        # the end vertex was never reached, meaning that there exists no valid path
         return None
 
+    def bidirectional_search(self, start_pos: tuple, end_pos: tuple) -> Optional[list]:
+        """ Returns the shortest path between two vertexes, if there exists such a path, in the
+        same format as breadth_first_search. Return None if no such path exists.
+
+        This method runs two Breadth First Searches at once, one from each end, always
+        expanding a full level of the side with the smaller frontier. Once the two searches
+        touch, the shortest connection found within that level is the shortest path, and only
+        a fraction of the vertices a single search would visit has been explored.
+
+        Preconditions
+          - self.connected(start_pos, end_pos)
+
+        >>> g = create_blank_graph(5, 1)
+        >>> g.bidirectional_search((0, 0), (4, 0))
+        [(1, 0), (2, 0), (3, 0)]
+        >>> g.vertices[(2, 0)].state = 'blocked'
+        >>> g.bidirectional_search((0, 0), (4, 0)) is None
+        True
+        """
+        if start_pos == end_pos:
+            return []
+        elif self.vertices[end_pos].state == 'blocked':
+            return None  # the end vertex can never be moved into
+
+        # each side maps the positions it reached to the position they were reached from
+        # and to their distance from that side's root
+        forward_parents, backward_parents = {start_pos: None}, {end_pos: None}
+        forward_depths, backward_depths = {start_pos: 0}, {end_pos: 0}
+        forward_frontier, backward_frontier = [start_pos], [end_pos]
+
+        while forward_frontier and backward_frontier:
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = self._expand_level(
+                    forward_frontier, forward_parents, forward_depths, backward_depths)
+            else:
+                backward_frontier, meeting = self._expand_level(
+                    backward_frontier, backward_parents, backward_depths, forward_depths)
+                if meeting is not None:
+                    meeting = (meeting[1], meeting[0])
+
+            if meeting is not None:
+                # meeting is an edge joining a forward vertex to a backward vertex
+                forward_half = rebuild_path(forward_parents, meeting[0])
+                backward_half = rebuild_path(backward_parents, meeting[1])
+                return (forward_half + backward_half[::-1])[1:-1]
+
+        # one of the searches ran out of vertices, meaning that there exists no valid path
+        return None
+
+    def _expand_level(self, frontier: list, parents: dict, depths: dict,
+                      other_depths: dict) -> tuple[list, Optional[tuple]]:
+        """ Expand every position of frontier (all at the same depth) for one side of
+        bidirectional_search, recording the newly reached positions in parents and depths.
+
+        Return the next frontier, along with the edge (this side's position, other side's
+        position) giving the shortest connection to the other side found in this level, or
+        None if the two sides did not touch.
+        """
+        next_frontier = []
+        meeting, meeting_length = None, math.inf
+
+        for pos in frontier:
+            for neighbour in self._open_neighbours(pos):
+                if neighbour in other_depths and other_depths[neighbour] < meeting_length:
+                    meeting, meeting_length = (pos, neighbour), other_depths[neighbour]
+                if neighbour not in parents:
+                    parents[neighbour] = pos
+                    depths[neighbour] = depths[pos] + 1
+                    next_frontier.append(neighbour)
+
+        return next_frontier, meeting
+
+    def distance_field(self, end_pos: tuple[int, int]) -> dict[tuple[int, int], int]:
+        """ Return a dictionary mapping every vertex that is not blocked and can reach the
+        vertex at end_pos to the number of steps it takes to get there (the distance field, or
+        flow field, of end_pos). It is empty if the vertex at end_pos is blocked.
+
+        The field is computed with a single Breadth First Search from end_pos and kept until
+        the version of the graph changes, for the last FLOW_FIELD_CACHE_SIZE end vertices.
+
+        >>> g = create_blank_graph(3, 1)
+        >>> g.distance_field((2, 0)) == {(0, 0): 2, (1, 0): 1, (2, 0): 0}
+        True
+        """
+        if self._flow_fields_version != self.version:
+            self._flow_fields = {}
+            self._flow_fields_version = self.version
+
+        if end_pos not in self._flow_fields:
+            if len(self._flow_fields) >= FLOW_FIELD_CACHE_SIZE:
+                # drop the field computed the longest time ago
+                del self._flow_fields[next(iter(self._flow_fields))]
+            self._flow_fields[end_pos] = self._compute_distance_field(end_pos)
+
+        return self._flow_fields[end_pos]
+
+    def _compute_distance_field(self, end_pos: tuple[int, int]) -> dict[tuple[int, int], int]:
+        """ Compute the distance field of end_pos described in distance_field.
+        """
+        if self.vertices[end_pos].state == 'blocked':
+            return {}
+
+        # edges go both ways, so searching outwards from the end vertex gives the distance
+        # from every vertex to it
+        field = {end_pos: 0}
+        que = deque([end_pos])
+        while que:
+            pos = que.popleft()
+            for neighbour in self._open_neighbours(pos):
+                if neighbour not in field:
+                    field[neighbour] = field[pos] + 1
+                    que.append(neighbour)
+
+        return field
+
+    def flow_field_search(self, start_pos: tuple, end_pos: tuple) -> Optional[list]:
+        """ Returns the shortest path between two vertexes in the format returned by
+        breadth_first_search, or None if no such path exists, by descending the distance field
+        of end_pos: from start_pos, each step moves to an adjacent vertex one step closer.
+
+        Once the field of end_pos has been computed, finding a path from any start vertex only
+        takes time proportional to the length of the path, which suits routing many starts
+        to the same end.
+
+        >>> g = create_blank_graph(3, 2)
+        >>> g.vertices[(1, 0)].state = 'blocked'
+        >>> g.flow_field_search((0, 0), (2, 0))
+        [(0, 1), (1, 1), (2, 1)]
+        """
+        if start_pos == end_pos:
+            return []
+
+        field = self.distance_field(end_pos)
+
+        # the start vertex may itself be blocked, so its first step is only chosen among
+        # the vertices of the field
+        steps = [u.pos for u in self.vertices[start_pos].neighbours if u.pos in field]
+        if steps == []:
+            return None
+
+        path = [min(steps, key=field.__getitem__)]
+        while field[path[-1]] > 0:
+            distance = field[path[-1]]
+            path.append(next(u.pos for u in self.vertices[path[-1]].neighbours
+                             if field.get(u.pos) == distance - 1))
+
+        return path[:-1]
+
+    def shortest_path(self, start_pos: tuple, end_pos: tuple,
+                      engine: str = 'bfs') -> Optional[list]:
+        """ Returns the shortest path between two vertexes computed with the given search
+        engine, in the format returned by breadth_first_search. Return None if no such path
+        exists.
+
+        Preconditions
+          - engine in SEARCH_ENGINES
+        """
+        if engine == 'bfs':
+            return self.breadth_first_search(start_pos, end_pos)
+        elif engine == 'a_star':
+            return self.a_star_search(start_pos, end_pos)
+        elif engine == 'bidirectional':
+            return self.bidirectional_search(start_pos, end_pos)
+        elif engine == 'flow_field':
+            return self.flow_field_search(start_pos, end_pos)
+        else:
+            raise ValueError
+
+    def _open_neighbours(self, pos: tuple[int, int]) -> list[tuple[int, int]]:
+        """ Return the positions of the vertices adjacent to the vertex at pos that are not
+        blocked, i.e. the vertices a search is allowed to move into from pos.
+        """
+        return [u.pos for u in self.vertices[pos].neighbours if u.state != 'blocked']
+
     def get_vertices(self) -> set[Vertex]:
         """ Return the set of vertices in this graph in the form of the
         vertex objects. """
@@ -197,6 +540,72 @@ class Graph:
 ####################
 
 
+def explore_connected(start: Any, target_pos: tuple, visited: set, stop_early: bool = True) -> bool:
+    """ Return whether the vertex start is connected to the vertex at target_pos through
+    vertices that are not blocked, WITHOUT using any of the vertices in visited. This works
+    for both Vertex and WeightedVertex objects.
+
+    The exploration is an iterative depth first search using an explicit stack, so it is not
+    limited by Python's recursion limit. Every vertex explored is added to visited. If
+    stop_early is True the search returns as soon as the target is found, otherwise it goes
+    on until visited holds every vertex connected to start.
+
+    Preconditions:
+        - start not in visited
+
+    >>> g = create_blank_graph(3000, 1)
+    >>> explore_connected(g.vertices[(0, 0)], (2999, 0), set())
+    True
+    """
+    found = start.pos == target_pos
+    if found and stop_early:
+        return True
+
+    visited.add(start)
+    stack = [start]
+    while stack:
+        vertex = stack.pop()
+        for u in vertex.neighbours:
+            # Don't explore visited or blocked vertices.
+            if u not in visited and u.state != 'blocked':
+                if u.pos == target_pos:
+                    if stop_early:
+                        return True
+                    found = True
+                visited.add(u)
+                stack.append(u)
+
+    return found
+
+
+def manhattan_distance(pos1: tuple[int, int], pos2: tuple[int, int]) -> int:
+    """ Return the Manhattan distance between two grid positions, the number of orthogonal
+    steps needed to go from one to the other on an empty grid.
+
+    >>> manhattan_distance((1, 2), (4, 0))
+    5
+    """
+    return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+
+
+def rebuild_path(parents: dict, end_pos: tuple) -> list:
+    """ Given a mapping of positions to the position they were reached from during a
+    search (with the start position mapped to None), return the full path from the start
+    position to end_pos, both included.
+
+    >>> rebuild_path({(0, 0): None, (1, 0): (0, 0), (2, 0): (1, 0)}, (2, 0))
+    [(0, 0), (1, 0), (2, 0)]
+    """
+    path = []
+    pos = end_pos
+    while pos is not None:
+        path.append(pos)
+        pos = parents[pos]
+
+    path.reverse()
+    return path
+
+
 def load_csv_into_graph(file_name: str) -> Graph:
     """ Given a csv file with map data, converts it to and returns a graph
     Note: the csv file must have a "B" every place there is a blocked vertex and P for a path
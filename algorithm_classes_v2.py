@@ -13,10 +13,36 @@ least costliest flight paths, with the same blocking functionality as levels 1 a
 This file is copyright (c) 2021 Michele Massa, Nischal Nair and Nathan Zavys-Cox.
 """
 from __future__ import annotations
-from typing import Optional, Union
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+from collections import OrderedDict
+import sys
+import heapq
+import itertools
 import math
 import csv
 
+import numpy as np
+
+from algorithm_classes import explore_connected, rebuild_path
+from snapshots import Snapshot, load_snapshot, snapshot_path
+
+
+#############
+# CONSTANTS #
+#############
+
+# search engines available to the weighted graphs, mapped to the names shown to the user
+WEIGHTED_SEARCH_ENGINES = {'dijkstra': "DIJKSTRA'S", 'a_star': 'A*',
+                           'bidirectional': "BIDIRECTIONAL DIJKSTRA'S",
+                           'table': 'ALL-PAIRS TABLE', 'tree': "CACHED DIJKSTRA'S"}
+
+# default number of bytes the shortest path trees cached by a weighted graph may take up
+TREE_CACHE_BUDGET = 2 ** 20
+
+# minimum correlation between edge weights and the distance between the edge ends for the
+# weights to be considered geometric (and an A* heuristic to be used)
+GEOMETRIC_CORRELATION = 0.7
+
 
 ###########
 # Classes #
@@ -45,42 +71,56 @@ class WeightedVertex:
     neighbours: dict[WeightedVertex, Union[int, float]]
     name: str  # city name
     menu_pos: Optional[tuple[int, int]]  # the position of each country in the customizing grid
-    state: Optional[str]  # 'start', 'end', 'blocked', none means normal
+    # Private Instance Attributes:
+    #   - _state: the value behind the state property
+    #   - _graph: the graph this vertex belongs to, which is told about every state change
+    _state: Optional[str]  # 'start', 'end', 'blocked', none means normal
+    _graph: Optional[WeightedGraph]
 
     def __init__(self, position: tuple[float, float],
                  neighbours: dict[WeightedVertex, Union[int, float]],
-                 name: str, menu_pos: tuple[int, int] = None, state: Optional[str] = None) -> None:
+                 name: str, menu_pos: tuple[int, int] = None, state: Optional[str] = None,
+                 graph: Optional[WeightedGraph] = None) -> None:
         """ Initialize a new vertex with the given item and neighbours.
         """
         self.pos = position
         self.neighbours = neighbours
-        self.state = state
+        self._state = state
+        self._graph = graph
         self.name = name
         self.menu_pos = menu_pos
 
+    @property
+    def state(self) -> Optional[str]:
+        """ The state of this vertex: 'start', 'end', 'blocked', 'path' or None.
+        """
+        return self._state
+
+    @state.setter
+    def state(self, new_state: Optional[str]) -> None:
+        """ Change the state of this vertex, letting the graph it belongs to know about it.
+        """
+        old_state, self._state = self._state, new_state
+        if self._graph is not None:
+            self._graph.record_state_change(self.pos, old_state, new_state)
+
     def check_connected(self, target_pos: tuple[float, float],
-                        visited: set[WeightedVertex]) -> bool:
+                        visited: set[WeightedVertex], stop_early: bool = True) -> bool:
         """ Return whether this vertex is connected to a vertex corresponding to the target_item,
         WITHOUT using any of the vertices in visited.
 
+        Every vertex explored is added to visited. If stop_early is False the exploration
+        carries on after the target has been found, so that visited ends up holding every
+        vertex connected to this one.
+
         Preconditions:
             - self not in visited
         """
-        if self.pos == target_pos:
-            # Our base case: the target_item is the current vertex
-            return True
-        # In case the stating vertex is a blocked vertex
-        elif self.state == "blocked":
+        if self.state == "blocked" and self.pos != target_pos:
+            # In case the stating vertex is a blocked vertex
             return False
         else:
-            visited.add(self)  # Add self to the set of visited vertices
-            for u in self.neighbours:
-                # Don't recurse to visited or blocked vertices.
-                if u not in visited and u.state != "blocked":
-                    if u.check_connected(target_pos, visited):
-                        return True
-
-            return False
+            return explore_connected(self, target_pos, visited, stop_early)
 
 
 class WeightedGraph:
@@ -88,12 +128,60 @@ class WeightedGraph:
     or countries. Similar to graph, however with changes in certain methods to accommodate
     for WeightedVertex. Also now uses Dijkstra Algorithm to find the shortest possible paths
     between two locations, since this algorithm uses weighted edges.
+
+    Instance Attributes:
+      - vertices: A dictionary mapping vertex positions on the screen to their vertex objects.
+      - version: int incremented whenever a change that can affect a search happens, i.e.
+      a vertex or edge is added, or a vertex becomes (or stops being) blocked.
+      - tree_cache_budget: the number of bytes the shortest path trees cached by
+      shortest_path_tree may take up.
     """
     vertices: dict[tuple[float, float], WeightedVertex]
+    version: int
+    tree_cache_budget: int
+    # Private Instance Attributes:
+    #   - _component_labels: maps the position of every vertex that is not blocked to the
+    #   label of its connected component, as computed by component_labels.
+    #   - _components_version: the version of the graph _component_labels was computed for.
+    #   - _heuristic_scale: the factor turning the distance between two vertex positions
+    #   into a lower bound of the weight of any path between them (0.0 when the weights
+    #   are not geometric), or None if it has not been computed since the last edge change.
+    #   - _path_table: the all-pairs table returned by path_table, or None if it has not
+    #   been built yet.
+    #   - _table_version: the version of the graph _path_table is up to date with.
+    #   - _blocked_changes: the (vertex, now blocked) changes made since _table_version,
+    #   in order, which are applied to _path_table on its next use.
+    #   - _trees: maps start vertices to their (dist, parents, size in bytes) shortest path
+    #   tree, from the least to the most recently used.
+    #   - _trees_version: the version of the graph _trees were computed for.
+    #   - _trees_size: the total size in bytes of the trees in _trees.
+    #   - _menu_index: maps the menu_pos of every vertex that has one to that vertex.
+    _component_labels: dict[tuple[float, float], int]
+    _components_version: int
+    _heuristic_scale: Optional[float]
+    _path_table: Optional[ShortestPathTable]
+    _table_version: int
+    _blocked_changes: list[tuple[WeightedVertex, bool]]
+    _trees: OrderedDict[WeightedVertex, tuple[dict, dict, int]]
+    _trees_version: int
+    _trees_size: int
+    _menu_index: dict[tuple[int, int], WeightedVertex]
 
     def __init__(self) -> None:
         """ Initialize an empty graph (no vertices or edges)."""
         self.vertices = {}
+        self.version = 0
+        self._component_labels = {}
+        self._components_version = -1
+        self._heuristic_scale = None
+        self._path_table = None
+        self._table_version = -1
+        self._blocked_changes = []
+        self.tree_cache_budget = TREE_CACHE_BUDGET
+        self._trees = OrderedDict()
+        self._trees_version = -1
+        self._trees_size = 0
+        self._menu_index = {}
 
     def add_vertex(self, position: tuple[float, float], name: str,
                    menu_pos: Optional[tuple[int, int]] = None, state: Optional[str] = None) -> None:
@@ -101,7 +189,13 @@ class WeightedGraph:
 
         The new vertex is not adjacent to any other vertices.
         """
-        self.vertices[position] = WeightedVertex(position, {}, name, menu_pos, state)
+        if position in self.vertices and self.vertices[position].menu_pos is not None:
+            del self._menu_index[self.vertices[position].menu_pos]
+
+        self.vertices[position] = WeightedVertex(position, {}, name, menu_pos, state, self)
+        if menu_pos is not None:
+            self._menu_index[menu_pos] = self.vertices[position]
+        self.version += 1
 
     def add_edge(self, pos1: tuple[float, float], pos2: tuple[float, float], distance: float = 1) \
             -> None:
@@ -115,58 +209,444 @@ class WeightedGraph:
         if pos1 in self.vertices and pos2 in self.vertices:
             v1, v2 = self.vertices[pos1], self.vertices[pos2]
             v1.neighbours[v2], v2.neighbours[v1] = distance, distance
+            self._heuristic_scale = None
+            self.version += 1
         else:
             # We didn't find an existing vertex for both items.
             raise ValueError
 
+    def add_edges(self, edges: Iterable[tuple[tuple[float, float], tuple[float, float], float]]) \
+            -> None:
+        """ Add every (position, position, weight) edge of edges to this graph at once.
+
+        Unlike add_edge, the positions are not checked, which is left to the caller (see
+        load_named_graph), so that large edge lists load quickly.
+
+        Preconditions:
+            - all(pos1 in self.vertices and pos2 in self.vertices for pos1, pos2, _ in edges)
+            - all(pos1 != pos2 for pos1, pos2, _ in edges)
+        """
+        vertices = self.vertices
+        for pos1, pos2, distance in edges:
+            v1, v2 = vertices[pos1], vertices[pos2]
+            v1.neighbours[v2], v2.neighbours[v1] = distance, distance
+
+        self._heuristic_scale = None
+        self.version += 1
+
+    def record_state_change(self, pos: tuple[float, float], old_state: Optional[str],
+                            new_state: Optional[str]) -> None:
+        """ Record that the state of the vertex at pos went from old_state to new_state.
+        Only changes to or from 'blocked' can affect a search, so only those change the
+        version of this graph (and make the component labels out of date). They are also
+        kept to update the all-pairs table incrementally.
+        """
+        if (old_state == 'blocked') != (new_state == 'blocked'):
+            self.version += 1
+            if self._path_table is not None:
+                self._blocked_changes.append((self.vertices[pos], new_state == 'blocked'))
+
+    def reset_states(self) -> None:
+        """ Set the state of every vertex of this graph back to the normal (None) state, as if
+        the graph had just been built.
+
+        >>> g = WeightedGraph()
+        >>> g.add_vertex((0, 0), 'a', state='blocked')
+        >>> g.reset_states()
+        >>> g.vertices[(0, 0)].state is None
+        True
+        """
+        for vertex in self.vertices.values():
+            if vertex.state is not None:
+                vertex.state = None
+
     def connected(self, pos1: tuple[float, float], pos2: tuple[float, float]) -> bool:
-        """ Return whether item1 and item2 are connected vertices in this graph.
+        """ Return whether item1 and item2 are connected vertices in this graph, through
+        vertices that are not blocked. Neither vertex can be blocked itself, unless they are
+        the same vertex.
 
         Return False if item1 or item2 do not appear as vertices in this graph.
+
+        The answer is a comparison of the component labels of the two vertices, which are
+        only recomputed after a vertex has been blocked or unblocked.
         """
         if pos1 in self.vertices and pos2 in self.vertices:
-            v1 = self.vertices[pos1]
-            return v1.check_connected(pos2, set())  # Pass in an empty "visited" set
+            if pos1 == pos2:
+                return True
+            labels = self.component_labels()
+            return pos1 in labels and labels.get(pos2) == labels[pos1]
         else:
             return False
 
+    def component_labels(self) -> dict[tuple[float, float], int]:
+        """ Return a dictionary mapping the position of every vertex that is not blocked to
+        the label of its connected component: two such vertices are connected if and only if
+        their labels are equal.
+
+        The labels are computed with a single sweep over the graph, and kept until the
+        version of the graph changes.
+        """
+        if self._components_version != self.version:
+            labels = {}
+            for pos, vertex in self.vertices.items():
+                if pos not in labels and vertex.state != 'blocked':
+                    component = set()
+                    explore_connected(vertex, pos, component, stop_early=False)
+                    label = len(labels)  # any label not given to a previous component
+                    for u in component:
+                        labels[u.pos] = label
+
+            self._component_labels = labels
+            self._components_version = self.version
+
+        return self._component_labels
+
     def dijkstra_search(self, start_pos: tuple[float, float], end_pos: tuple[float, float]) -> dict:
         """ Returns the shortest possible distance between start and end points using the Dijkstra
-        Algorithm, which uses a greedy implementation to first calculate the shortest paths from
-        the start vertex to every other vertex in the graph, and then identifies the shortest
-        path for start to end, excluding any blocked vertices, either in terms of physical distance
-        or flight cost, depending on level 3 or level 4 implementations
+        Algorithm, which greedily settles the closest unsettled vertex (kept in a binary heap)
+        until the end vertex is settled, and then identifies the shortest path from start to
+        end, excluding any blocked vertices, either in terms of physical distance or flight
+        cost, depending on level 3 or level 4 implementations
 
         Returns this as a dictionary in the form
         {end_pos: [distance/cost of start_pos to end_pos, [path from start to end]]}
 
         Preconditions
           - self.connected(start_pos, end_pos)
+
+        >>> g = WeightedGraph()
+        >>> for i in range(3):
+        ...     g.add_vertex((i, 0), str(i))
+        >>> g.add_edge((0, 0), (1, 0), 2)
+        >>> g.add_edge((1, 0), (2, 0), 3)
+        >>> g.add_edge((0, 0), (2, 0), 10)
+        >>> g.dijkstra_search((0, 0), (2, 0))
+        {(2, 0): [5, [(0, 0), (1, 0), (2, 0)]]}
         """
         # Extracting the start and end vertices
         start_vertex = self.vertices[start_pos]
         end_vertex = self.vertices[end_pos]
 
-        # initialising distances from the start vertex to infinity, except the start vertex itself
-        dist = {start_vertex: [0, [start_vertex.pos]]}
-        for v in self.vertices.values():
-            if v != start_vertex:
-                dist[v] = [math.inf, [start_vertex.pos]]
+        dist, parents = heap_search(start_vertex, end_vertex, self._open_neighbours)
+
+        if end_vertex not in dist:
+            # the end vertex could not be reached from the start vertex
+            return {end_pos: [math.inf, [start_pos]]}
+        else:
+            path = [v.pos for v in rebuild_path(parents, end_vertex)]
+            return {end_pos: [dist[end_vertex], path]}
+
+    def a_star_search(self, start_pos: tuple[float, float], end_pos: tuple[float, float]) -> dict:
+        """ Returns the shortest possible distance between start and end points in the same
+        form as dijkstra_search, using the A* algorithm.
+
+        The heuristic is the straight line distance between a vertex position and the end
+        position, multiplied by heuristic_scale() so that it never overestimates the weight
+        of the remaining path. When the edge weights have nothing to do with the vertex
+        positions (flight costs for instance) the scale is 0 and this is exactly
+        dijkstra_search.
+
+        Preconditions
+          - self.connected(start_pos, end_pos)
+        """
+        start_vertex = self.vertices[start_pos]
+        end_vertex = self.vertices[end_pos]
+        scale = self.heuristic_scale()
+
+        if scale > 0:
+            def heuristic(vertex: WeightedVertex) -> float:
+                return scale * math.dist(vertex.pos, end_pos)
+        else:
+            heuristic = None
+
+        dist, parents = heap_search(start_vertex, end_vertex, self._open_neighbours, heuristic)
+
+        if end_vertex not in dist:
+            # the end vertex could not be reached from the start vertex
+            return {end_pos: [math.inf, [start_pos]]}
+        else:
+            path = [v.pos for v in rebuild_path(parents, end_vertex)]
+            return {end_pos: [dist[end_vertex], path]}
+
+    def bidirectional_search(self, start_pos: tuple[float, float],
+                             end_pos: tuple[float, float]) -> dict:
+        """ Returns the shortest possible distance between start and end points in the same
+        form as dijkstra_search, using a bidirectional version of Dijkstra's algorithm.
+
+        One search grows from each end, and the side whose closest unsettled vertex is nearer
+        to its root settles next. Every time an edge relaxation touches a vertex the other side
+        has reached, the best known start to end distance is updated. The searches stop once
+        the closest unsettled vertices of both sides add up to at least that distance, as no
+        unexplored connection can be shorter from then on.
+
+        Preconditions
+          - self.connected(start_pos, end_pos)
+
+        >>> g = WeightedGraph()
+        >>> for i in range(4):
+        ...     g.add_vertex((i, 0), str(i))
+        >>> g.add_edge((0, 0), (1, 0), 1)
+        >>> g.add_edge((1, 0), (2, 0), 1)
+        >>> g.add_edge((2, 0), (3, 0), 1)
+        >>> g.add_edge((0, 0), (3, 0), 5)
+        >>> g.bidirectional_search((0, 0), (3, 0))
+        {(3, 0): [3, [(0, 0), (1, 0), (2, 0), (3, 0)]]}
+        """
+        start_vertex = self.vertices[start_pos]
+        end_vertex = self.vertices[end_pos]
+
+        if start_vertex is end_vertex:
+            return {end_pos: [0, [start_pos]]}
+        elif end_vertex.state == 'blocked':
+            return {end_pos: [math.inf, [start_pos]]}
+
+        # index 0 holds the forward search (from start), index 1 the backward search (from end)
+        counter = itertools.count()
+        dist = ({start_vertex: 0}, {end_vertex: 0})
+        parents = ({start_vertex: None}, {end_vertex: None})
+        settled = (set(), set())
+        heaps = ([(0, next(counter), start_vertex)], [(0, next(counter), end_vertex)])
+        best = (math.inf, None)  # the shortest connection found, and the vertex it meets at
 
-        # Greedy implementation of the Dijkstra algorithm
-        all_vertices = set(self.vertices.values())
-        while all_vertices:
-            min_distance = min([dist[vert][0] for vert in all_vertices])
-            min_vertex = [vert for vert in all_vertices if dist[vert][0] == min_distance][0]
-            all_vertices.remove(min_vertex)
+        while heaps[0] and heaps[1] and heaps[0][0][0] + heaps[1][0][0] < best[0]:
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
 
-            for u in min_vertex.neighbours:
-                if dist[u][0] > dist[min_vertex][0] + min_vertex.neighbours[u] \
-                        and u.state != 'blocked':
-                    dist[u][0] = dist[min_vertex][0] + min_vertex.neighbours[u]
-                    dist[u][1] = dist[min_vertex][1] + [u.pos]
+            node_dist, node = heapq.heappop(heaps[side])[::2]
+            if node in settled[side]:
+                continue  # stale entry, the vertex was already settled through a shorter path
+            settled[side].add(node)
 
-        return {vert.pos: dist[vert] for vert in dist if vert == end_vertex}
+            connection = self._relax_edges(node, node_dist, counter,
+                                           (dist[side], parents[side], heaps[side]),
+                                           dist[1 - side])
+            if connection[0] < best[0]:
+                best = connection
+
+        if best[1] is None:
+            # the two searches never touched, so the end vertex cannot be reached
+            return {end_pos: [math.inf, [start_pos]]}
+        else:
+            # the backward half is rebuilt from the end to the meeting vertex, so it is reversed
+            return {end_pos: [best[0], [v.pos for v in rebuild_path(parents[0], best[1])
+                                        + rebuild_path(parents[1], best[1])[-2::-1]]]}
+
+    def _relax_edges(self, node: WeightedVertex, node_dist: float, counter: Iterator[int],
+                     side: tuple[dict, dict, list], other_dist: dict) \
+            -> tuple[float, Optional[WeightedVertex]]:
+        """ Relax the edges of node, just settled at distance node_dist by one side of
+        bidirectional_search whose (dist, parents, heap) are given, pushing every vertex
+        reached through a shorter path onto the heap.
+
+        Return the length of the shortest start to end connection going through one of these
+        vertices that the other side (whose distances are other_dist) has reached, along with
+        that vertex, or (math.inf, None) if there is none.
+        """
+        dist, parents, heap = side
+        best, meeting = math.inf, None
+
+        for u, weight in self._open_neighbours(node):
+            new_dist = node_dist + weight
+            if new_dist < dist.get(u, math.inf):
+                dist[u] = new_dist
+                parents[u] = node
+                heapq.heappush(heap, (new_dist, next(counter), u))
+
+                if u in other_dist and new_dist + other_dist[u] < best:
+                    best, meeting = new_dist + other_dist[u], u
+
+        return best, meeting
+
+    def heuristic_scale(self) -> float:
+        """ Return the largest factor s such that s times the straight line distance between
+        the positions of any two adjacent vertices is at most the weight of their edge. By the
+        triangle inequality, s times the straight line distance between any two vertices is
+        then a lower bound of the weight of any path between them.
+
+        Return 0.0 (no usable heuristic) if the edge weights are not geometric, which we
+        detect as weights that do not correlate strongly with the distance between the edge
+        ends (see GEOMETRIC_CORRELATION). The result is cached until an edge is added.
+
+        >>> g = WeightedGraph()
+        >>> for i in range(3):
+        ...     g.add_vertex((float(i), 0.0), str(i))
+        >>> g.add_edge((0.0, 0.0), (1.0, 0.0), 20)
+        >>> g.add_edge((1.0, 0.0), (2.0, 0.0), 10)
+        >>> g.add_edge((0.0, 0.0), (2.0, 0.0), 25)
+        >>> g.heuristic_scale()
+        10.0
+        """
+        if self._heuristic_scale is None:
+            lengths, weights = [], []
+            for v in self.vertices.values():
+                for u, weight in v.neighbours.items():
+                    length = math.dist(v.pos, u.pos)
+                    if length > 0:
+                        lengths.append(length)
+                        weights.append(weight)
+
+            if len(lengths) > 1 and correlation(lengths, weights) >= GEOMETRIC_CORRELATION:
+                self._heuristic_scale = min(w / d for d, w in zip(lengths, weights))
+            else:
+                self._heuristic_scale = 0.0
+
+        return self._heuristic_scale
+
+    def shortest_path(self, start_pos: tuple[float, float], end_pos: tuple[float, float],
+                      engine: str = 'dijkstra') -> dict:
+        """ Returns the shortest possible distance between start and end points computed
+        with the given search engine, in the form returned by dijkstra_search.
+
+        Preconditions
+          - engine in WEIGHTED_SEARCH_ENGINES
+        """
+        if engine == 'dijkstra':
+            return self.dijkstra_search(start_pos, end_pos)
+        elif engine == 'a_star':
+            return self.a_star_search(start_pos, end_pos)
+        elif engine == 'bidirectional':
+            return self.bidirectional_search(start_pos, end_pos)
+        elif engine == 'table':
+            return self.table_search(start_pos, end_pos)
+        elif engine == 'tree':
+            return self.tree_search(start_pos, end_pos)
+        else:
+            raise ValueError
+
+    def table_search(self, start_pos: tuple[float, float], end_pos: tuple[float, float]) -> dict:
+        """ Returns the shortest possible distance between start and end points in the same
+        form as dijkstra_search, by looking the pair up in the all-pairs table of this graph
+        (see path_table) and unrolling its path one next hop at a time.
+
+        Preconditions
+          - self.connected(start_pos, end_pos)
+
+        >>> g = WeightedGraph()
+        >>> for i in range(3):
+        ...     g.add_vertex((i, 0), str(i))
+        >>> g.add_edge((0, 0), (1, 0), 2)
+        >>> g.add_edge((1, 0), (2, 0), 3)
+        >>> g.add_edge((0, 0), (2, 0), 10)
+        >>> g.table_search((0, 0), (2, 0))
+        {(2, 0): [5, [(0, 0), (1, 0), (2, 0)]]}
+        >>> g.vertices[(1, 0)].state = 'blocked'
+        >>> g.table_search((0, 0), (2, 0))
+        {(2, 0): [10, [(0, 0), (2, 0)]]}
+        """
+        table = self.path_table()
+        path = table.path(self.vertices[start_pos], self.vertices[end_pos])
+
+        if path is None:
+            # the end vertex could not be reached from the start vertex
+            return {end_pos: [math.inf, [start_pos]]}
+        else:
+            # summing the edge weights in path order gives exactly the distance of dijkstra_search
+            cost = 0
+            for v, u in zip(path, path[1:]):
+                cost += v.neighbours[u]
+            return {end_pos: [cost, [v.pos for v in path]]}
+
+    def tree_search(self, start_pos: tuple[float, float], end_pos: tuple[float, float]) -> dict:
+        """ Returns the shortest possible distance between start and end points in the same
+        form as dijkstra_search, read from the shortest path tree of start_pos (see
+        shortest_path_tree), so that only the path is rebuilt when the tree is cached.
+
+        Preconditions
+          - self.connected(start_pos, end_pos)
+
+        >>> g = WeightedGraph()
+        >>> for i in range(3):
+        ...     g.add_vertex((i, 0), str(i))
+        >>> g.add_edge((0, 0), (1, 0), 2)
+        >>> g.add_edge((1, 0), (2, 0), 3)
+        >>> g.add_edge((0, 0), (2, 0), 10)
+        >>> g.tree_search((0, 0), (2, 0))
+        {(2, 0): [5, [(0, 0), (1, 0), (2, 0)]]}
+        >>> g.tree_search((0, 0), (1, 0))
+        {(1, 0): [2, [(0, 0), (1, 0)]]}
+        """
+        end_vertex = self.vertices[end_pos]
+        dist, parents = self.shortest_path_tree(start_pos)
+
+        if end_vertex not in dist:
+            # the end vertex could not be reached from the start vertex
+            return {end_pos: [math.inf, [start_pos]]}
+        else:
+            path = [v.pos for v in rebuild_path(parents, end_vertex)]
+            return {end_pos: [dist[end_vertex], path]}
+
+    def shortest_path_tree(self, start_pos: tuple[float, float]) -> tuple[dict, dict]:
+        """ Return the shortest path tree of the vertex at start_pos, as the (dist, parents)
+        dictionaries returned by heap_search when settling every vertex it can reach.
+
+        Trees are cached by start vertex until the version of the graph changes. When they
+        take up more than tree_cache_budget bytes, the least recently used ones are dropped.
+        """
+        if self._trees_version != self.version:
+            self._trees.clear()
+            self._trees_size = 0
+            self._trees_version = self.version
+
+        start_vertex = self.vertices[start_pos]
+        if start_vertex in self._trees:
+            self._trees.move_to_end(start_vertex)
+        else:
+            dist, parents = heap_search(start_vertex, None, self._open_neighbours)
+            # the vertices themselves are shared with the graph, only the dictionaries count
+            size = sys.getsizeof(dist) + sys.getsizeof(parents)
+            self._trees[start_vertex] = (dist, parents, size)
+            self._trees_size += size
+
+            # always keep the newest tree, even if it does not fit in the budget on its own
+            while self._trees_size > self.tree_cache_budget and len(self._trees) > 1:
+                _, (_, _, old_size) = self._trees.popitem(last=False)
+                self._trees_size -= old_size
+
+        dist, parents, _ = self._trees[start_vertex]
+        return dist, parents
+
+    def path_table(self) -> ShortestPathTable:
+        """ Return the all-pairs shortest path table of this graph, building it on first use
+        (or after a vertex or edge has been added) and otherwise bringing it up to date with
+        the vertices blocked and unblocked since its last use.
+        """
+        if self._path_table is not None and \
+                self._table_version + len(self._blocked_changes) == self.version:
+            for vertex, blocked in self._blocked_changes:
+                if blocked:
+                    self._path_table.block(vertex, self._open_neighbours)
+                else:
+                    self._path_table.unblock(vertex)
+        else:
+            self._path_table = ShortestPathTable(list(self.vertices.values()),
+                                                 self._open_neighbours)
+
+        self._blocked_changes = []
+        self._table_version = self.version
+        return self._path_table
+
+    @staticmethod
+    def _open_neighbours(vertex: WeightedVertex) -> list[tuple[WeightedVertex, float]]:
+        """ Return the (neighbour, edge weight) pairs of the vertices adjacent to vertex
+        that are not blocked, i.e. the vertices a search is allowed to move into from vertex.
+        """
+        return [(u, weight) for u, weight in vertex.neighbours.items() if u.state != 'blocked']
+
+    def vertex_at_menu_pos(self, menu_pos: tuple[int, int]) -> Optional[WeightedVertex]:
+        """ Return the vertex shown in the cell at menu_pos of the selection menu grid, or
+        None if no vertex of this graph is shown there.
+
+        The index from menu positions to vertices is kept up to date by add_vertex, so looking
+        up a cell takes constant time and never reads the files the graph was loaded from.
+
+        >>> g = world_cities_graph(8, 10)
+        >>> g.vertex_at_menu_pos((5, 1)).pos
+        (203.0, 391.0)
+        >>> g.vertex_at_menu_pos((5, 6)).pos
+        (538.0, 344.0)
+        >>> g.vertex_at_menu_pos((8, 0)) is None
+        True
+        """
+        return self._menu_index.get(menu_pos)
 
     def get_vertices(self) -> set[WeightedVertex]:
         """ Return the set of vertices in this graph in the form of the
@@ -174,43 +654,562 @@ class WeightedGraph:
         """
         return {self.vertices[vertex] for vertex in self.vertices}
 
+    def get_edges(self) -> list[tuple[WeightedVertex, WeightedVertex, float]]:
+        """ Return a list of the edges of this graph as (vertex, vertex, weight) tuples, each
+        edge appearing once.
+        """
+        order = {v: i for i, v in enumerate(self.vertices.values())}
+        return [(v, u, weight) for v in self.vertices.values()
+                for u, weight in v.neighbours.items() if order[v] < order[u]]
+
+
+class CSRGraph:
+    """ A frozen, array-based form of a WeightedGraph, storing its adjacency in compressed
+    sparse row (CSR) format: the vertices are numbered from 0 to n - 1, and the neighbours
+    of vertex i are indices[indptr[i]:indptr[i + 1]], reached through edges of weights
+    weights[indptr[i]:indptr[i + 1]]. Every undirected edge is stored once in each direction.
+
+    The vertices and edges cannot change, but vertices can still be blocked through the
+    blocked mask. Searches take and return vertex positions, in the same form as the
+    WeightedGraph searches, so a CSRGraph can answer the queries of a WeightedGraph.
+
+    Instance Attributes:
+      - names: the name of each vertex
+      - positions: an (n, 2) array of the position of each vertex
+      - indptr: an array of n + 1 offsets into indices and weights
+      - indices: the neighbour of every stored edge
+      - weights: the weight of every stored edge
+      - blocked: a boolean array telling whether each vertex is blocked
+      - ids: a dictionary mapping each vertex position to its number
+
+    Representation Invariants:
+      - len(self.names) == len(self.positions) == len(self.indptr) - 1 == len(self.blocked)
+      - len(self.indices) == len(self.weights) == self.indptr[-1]
+    """
+    names: list[str]
+    positions: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    weights: np.ndarray
+    blocked: np.ndarray
+    ids: dict[tuple[float, float], int]
+    # Private Instance Attributes:
+    #   - _heuristic_scale: same as WeightedGraph._heuristic_scale, computed on first use
+    _heuristic_scale: Optional[float]
+
+    def __init__(self, names: list[str], positions: np.ndarray, indptr: np.ndarray,
+                 indices: np.ndarray, weights: np.ndarray,
+                 blocked: Optional[np.ndarray] = None) -> None:
+        """ Initialize a CSR graph from its arrays. The structure arrays are made read-only.
+        """
+        self.names = names
+        self.positions = positions
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        for arr in (positions, indptr, indices, weights):
+            if arr.flags.writeable:
+                arr.flags.writeable = False
+
+        self.blocked = np.zeros(len(names), dtype=bool) if blocked is None else blocked
+        self.ids = {(float(x), float(y)): i for i, (x, y) in enumerate(positions.tolist())}
+        self._heuristic_scale = None
+
+    def set_blocked(self, pos: tuple[float, float], blocked: bool = True) -> None:
+        """ Block (or unblock) the vertex at pos.
+        """
+        self.blocked[self.ids[pos]] = blocked
+
+    def dijkstra_search(self, start_pos: tuple[float, float], end_pos: tuple[float, float]) -> dict:
+        """ Returns the shortest possible distance between start and end points, exactly like
+        WeightedGraph.dijkstra_search.
+
+        >>> cities = world_cities_graph(8, 10)
+        >>> g = csr_from_weighted_graph(cities)
+        >>> start, end = (78.0, 218.0), (120.0, 270.0)
+        >>> g.dijkstra_search(start, end) == cities.dijkstra_search(start, end)
+        True
+        """
+        return self._search(start_pos, end_pos, None)
+
+    def a_star_search(self, start_pos: tuple[float, float], end_pos: tuple[float, float]) -> dict:
+        """ Returns the shortest possible distance between start and end points, exactly like
+        WeightedGraph.a_star_search (the heuristic is only used if the weights are geometric).
+        """
+        scale = self.heuristic_scale()
+        if scale > 0:
+            remaining = scale * np.hypot(self.positions[:, 0] - end_pos[0],
+                                         self.positions[:, 1] - end_pos[1])
+            return self._search(start_pos, end_pos, remaining.tolist().__getitem__)
+        else:
+            return self._search(start_pos, end_pos, None)
+
+    def shortest_path(self, start_pos: tuple[float, float], end_pos: tuple[float, float],
+                      engine: str = 'dijkstra') -> dict:
+        """ Returns the shortest possible distance between start and end points computed
+        with the given search engine, like WeightedGraph.shortest_path.
+
+        Preconditions
+          - engine in {'dijkstra', 'a_star'}
+        """
+        if engine == 'dijkstra':
+            return self.dijkstra_search(start_pos, end_pos)
+        elif engine == 'a_star':
+            return self.a_star_search(start_pos, end_pos)
+        else:
+            raise ValueError
+
+    def heuristic_scale(self) -> float:
+        """ Return the A* heuristic scale of this graph, computed exactly like
+        WeightedGraph.heuristic_scale but over the edge arrays at once.
+        """
+        if self._heuristic_scale is None:
+            sources = np.repeat(np.arange(len(self.names)), np.diff(self.indptr))
+            lengths = np.hypot(*(self.positions[sources] - self.positions[self.indices]).T)
+            usable = lengths > 0
+            lengths, weights = lengths[usable], self.weights[usable]
+
+            if len(lengths) > 1 and \
+                    correlation(lengths.tolist(), weights.tolist()) >= GEOMETRIC_CORRELATION:
+                self._heuristic_scale = float(np.min(weights / lengths))
+            else:
+                self._heuristic_scale = 0.0
+
+        return self._heuristic_scale
+
+    def _search(self, start_pos: tuple[float, float], end_pos: tuple[float, float],
+                heuristic: Optional[Callable[[int], float]]) -> dict:
+        """ Run heap_search between the vertices at start_pos and end_pos with the given
+        heuristic, and return the result in the form of WeightedGraph.dijkstra_search.
+        """
+        start, end = self.ids[start_pos], self.ids[end_pos]
+        dist, parents = heap_search(start, end, self._open_neighbours, heuristic)
+
+        if end not in dist:
+            return {end_pos: [math.inf, [start_pos]]}
+        else:
+            path = [(float(self.positions[i, 0]), float(self.positions[i, 1]))
+                    for i in rebuild_path(parents, end)]
+            return {end_pos: [dist[end], path]}
+
+    def _open_neighbours(self, i: int) -> Iterable[tuple[int, float]]:
+        """ Return the (neighbour, edge weight) pairs of the vertices adjacent to vertex i
+        that are not blocked.
+        """
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        neighbours = self.indices[lo:hi]
+        is_open = ~self.blocked[neighbours]
+        return zip(neighbours[is_open].tolist(), self.weights[lo:hi][is_open].tolist())
+
+
+class ShortestPathTable:
+    """ An all-pairs shortest path table over the vertices of a WeightedGraph, giving for every
+    (start, end) pair the weight of the shortest path between them and the vertex the path goes
+    through right after start (its next hop). Any path is then unrolled by following the next
+    hops of its remaining part: the rest of a shortest path is itself a shortest path.
+
+    Paths never go through blocked vertices, although they may start at one. The table can be
+    updated when a single vertex is blocked or unblocked, without being built again.
+
+    Instance Attributes:
+      - vertices: the vertices of the graph, numbered by their index in this list
+      - ids: a dictionary mapping each vertex to its number
+      - dist: an n by n array where dist[i, j] is the weight of the shortest path from vertex
+      i to vertex j (infinity if there is none)
+      - next_hop: an n by n array where next_hop[i, j] is the number of the second vertex of
+      the shortest path from vertex i to vertex j (-1 if there is none, or if i == j)
+
+    Representation Invariants:
+      - self.dist.shape == self.next_hop.shape == (len(self.vertices), len(self.vertices))
+    """
+    vertices: list[WeightedVertex]
+    ids: dict[WeightedVertex, int]
+    dist: np.ndarray
+    next_hop: np.ndarray
+
+    def __init__(self, vertices: list[WeightedVertex],
+                 expand: Callable[[WeightedVertex], Iterable[tuple[WeightedVertex, float]]]) \
+            -> None:
+        """ Build the table by running Dijkstra's algorithm from every vertex, where
+        expand(vertex) returns the (neighbour, edge weight) pairs a path may move into.
+
+        The graphs of our program are small and sparse, for which repeated heap searches do
+        less work than the Floyd-Warshall algorithm.
+        """
+        self.vertices = vertices
+        self.ids = {v: i for i, v in enumerate(vertices)}
+        self.dist = np.full((len(vertices), len(vertices)), math.inf)
+        self.next_hop = np.full((len(vertices), len(vertices)), -1, dtype=np.int32)
+
+        for i in range(len(vertices)):
+            self._compute_row(i, expand)
+
+    def path(self, start: WeightedVertex, end: WeightedVertex) -> Optional[list[WeightedVertex]]:
+        """ Return the vertices of the shortest path from start to end (both included), or None
+        if there is no such path.
+        """
+        i, j = self.ids[start], self.ids[end]
+        if self.dist[i, j] == math.inf:
+            return None
+
+        path = [i]
+        while path[-1] != j:
+            path.append(int(self.next_hop[path[-1], j]))
+        return [self.vertices[k] for k in path]
+
+    def block(self, vertex: WeightedVertex,
+              expand: Callable[[WeightedVertex], Iterable[tuple[WeightedVertex, float]]]) -> None:
+        """ Update the table after vertex has been blocked, expand being the same function
+        given when the table was built (and already ignoring vertex).
+
+        Only the rows of the starts with a shortest path through vertex are computed again;
+        every other row simply loses its path to vertex.
+        """
+        k = self.ids[vertex]
+        # a row may route through vertex if going through it is as short as its best path
+        # (up to rounding) for some other end
+        through = self.dist[:, k, None] + self.dist[None, k, :]
+        tolerance = 1e-9 * np.maximum(1.0, np.where(np.isfinite(self.dist), self.dist, 0.0))
+        uses = (through <= self.dist + tolerance) & np.isfinite(self.dist)
+        uses[:, k] = False
+        np.fill_diagonal(uses, False)
+        affected = uses.any(axis=1)
+        affected[k] = False  # paths may still start at a blocked vertex
+
+        self.dist[:, k] = math.inf
+        self.next_hop[:, k] = -1
+        self.dist[k, k] = 0
+        for i in np.flatnonzero(affected).tolist():
+            self._compute_row(i, expand)
+
+    def unblock(self, vertex: WeightedVertex) -> None:
+        """ Update the table after vertex has been unblocked, as if it had just been inserted.
+
+        The paths starting at vertex never went through it, so its row is still correct. The
+        shortest path from every start to vertex comes through one of its neighbours, and
+        every other pair keeps its path unless going through vertex is now shorter.
+        """
+        k = self.ids[vertex]
+        n = len(self.vertices)
+        dist_to_k = np.full(n, math.inf)
+        hop_to_k = np.full(n, -1, dtype=np.int32)
+        for u, weight in vertex.neighbours.items():
+            j = self.ids[u]
+            candidate = self.dist[:, j] + weight
+            better = candidate < dist_to_k
+            dist_to_k[better] = candidate[better]
+            # the first hop towards vertex is the first hop towards the neighbour, or vertex
+            # itself when starting at the neighbour
+            hop_to_k[better] = self.next_hop[better, j]
+            if better[j]:
+                hop_to_k[j] = k
+        dist_to_k[k], hop_to_k[k] = 0, -1
+
+        through = dist_to_k[:, None] + self.dist[None, k, :]
+        better = through < self.dist
+        self.dist = np.where(better, through, self.dist)
+        self.next_hop = np.where(better, hop_to_k[:, None], self.next_hop).astype(np.int32)
+        self.dist[:, k] = dist_to_k
+        self.next_hop[:, k] = hop_to_k
+
+    def _compute_row(self, i: int,
+                     expand: Callable[[WeightedVertex], Iterable[tuple[WeightedVertex, float]]]) \
+            -> None:
+        """ Fill row i of the table with a single run of heap_search from vertex i.
+        """
+        dist, parents = heap_search(self.vertices[i], None, expand)
+        self.dist[i] = math.inf
+        self.next_hop[i] = -1
+
+        # vertices are settled after their parent, so the first hop of each vertex is known
+        # by the time it is reached in dist
+        first_hop = {}
+        for v, d in dist.items():
+            j = self.ids[v]
+            self.dist[i, j] = d
+            parent = parents[v]
+            if parent is not None:
+                first_hop[v] = j if parents[parent] is None else first_hop[parent]
+                self.next_hop[i, j] = first_hop[v]
+
+
+##################
+# Search engines #
+##################
+
+
+def heap_search(start: Any, target: Optional[Any],
+                expand: Callable[[Any], Iterable[tuple[Any, float]]],
+                heuristic: Optional[Callable[[Any], float]] = None) -> tuple[dict, dict]:
+    """ Run Dijkstra's algorithm from start, using a binary heap with lazy deletion (stale
+    heap entries are skipped when popped instead of being decreased in place).
+
+    expand(node) must return the (neighbour, edge weight) pairs a search may move into from
+    node. The search stops as soon as target is settled; pass None as the target to settle
+    every reachable node.
+
+    If a heuristic is given the search becomes A*: nodes are settled in order of their
+    distance plus heuristic(node), an estimate of their remaining distance to target. The
+    heuristic must be consistent (never decrease by more than the weight of the edge
+    travelled) for the distances returned to be the shortest ones.
+
+    Returns a tuple (dist, parents) where dist maps every settled node to its distance from
+    start and parents maps every settled node to the node it was reached from (start is
+    mapped to None), ready to be passed to rebuild_path.
+
+    >>> edges = {'a': [('b', 1), ('c', 4)], 'b': [('c', 1)], 'c': []}
+    >>> heap_search('a', 'c', lambda node: edges[node])
+    ({'a': 0, 'b': 1, 'c': 2}, {'a': None, 'b': 'a', 'c': 'b'})
+    """
+    dist = {}
+    parents = {}
+    best = {start: 0}
+    reached_from = {start: None}
+
+    # heap entries are (priority, tie breaker, node), the counter keeps nodes from being compared
+    counter = itertools.count()
+    heap = [(0, next(counter), start)]
+
+    while heap:
+        _, _, node = heapq.heappop(heap)
+        if node in dist:
+            continue  # stale entry, the node was already settled through a shorter path
+
+        node_dist = best[node]
+        dist[node] = node_dist
+        parents[node] = reached_from[node]
+        if node == target:
+            break
+
+        for neighbour, weight in expand(node):
+            new_dist = node_dist + weight
+            if neighbour not in dist and new_dist < best.get(neighbour, math.inf):
+                best[neighbour] = new_dist
+                reached_from[neighbour] = node
+                priority = new_dist if heuristic is None else new_dist + heuristic(neighbour)
+                heapq.heappush(heap, (priority, next(counter), neighbour))
+
+    return dist, parents
+
+
+def correlation(xs: list[float], ys: list[float]) -> float:
+    """ Return the Pearson correlation coefficient of the two given samples, or 0.0 if one of
+    them is constant.
+
+    Preconditions:
+        - len(xs) == len(ys) > 0
+
+    >>> correlation([1, 2, 3], [2, 4, 6])
+    1.0
+    """
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+
+    if var_x == 0 or var_y == 0:
+        return 0.0
+    else:
+        return cov / math.sqrt(var_x * var_y)
+
 
 ############################
 # Graph creation functions #
 ############################
 
 
-def world_cities_graph(width: int, height: int) -> WeightedGraph:
-    """ Returns a WeightedGraph that represents the world map, containing vertices as cities
-    as given in the file containing a list of cities, and edges as given on our source map
-    as stored in edges. The function arguments are there to define the menu grid positions
-    in the selection screen, where the use chooses start, end and blocked locations for
-    levels 3 and 4.
+def build_csr_graph(names: list[str], positions: list[tuple[float, float]],
+                    edges: list[tuple[int, int, float]]) -> CSRGraph:
+    """ Return the CSRGraph with the given vertex names and positions, and the given
+    undirected (vertex number, vertex number, weight) edges.
+
+    >>> g = build_csr_graph(['a', 'b', 'c'], [(0, 0), (1, 0), (2, 0)], [(0, 1, 5), (1, 2, 3)])
+    >>> g.indptr.tolist(), g.indices.tolist()
+    ([0, 1, 3, 4], [1, 2, 0, 1])
+    """
+    n = len(names)
+    edge_array = np.array(edges, dtype=float).reshape(-1, 3)
+    ends1, ends2 = edge_array[:, 0].astype(np.int64), edge_array[:, 1].astype(np.int64)
+
+    # store every edge in both directions, grouped by the vertex it starts from
+    sources = np.concatenate((ends1, ends2))
+    targets = np.concatenate((ends2, ends1))
+    weights = np.concatenate((edge_array[:, 2], edge_array[:, 2]))
+    order = np.argsort(sources, kind='stable')
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+
+    return CSRGraph(list(names), np.array(positions, dtype=float).reshape(-1, 2), indptr,
+                    targets[order].astype(np.int32), weights[order])
+
+
+def csr_from_weighted_graph(graph: WeightedGraph) -> CSRGraph:
+    """ Return the CSRGraph form of the given weighted graph, with its blocked vertices
+    blocked in the blocked mask.
+    """
+    vertices = list(graph.vertices.values())
+    ids = {v: i for i, v in enumerate(vertices)}
+    edges = [(ids[v], ids[u], weight) for v, u, weight in graph.get_edges()]
+
+    csr = build_csr_graph([v.name for v in vertices], [v.pos for v in vertices], edges)
+    csr.blocked[:] = [v.state == 'blocked' for v in vertices]
+    return csr
+
+
+def load_csr_graph(vertex_file: str, edge_file: str) -> CSRGraph:
+    """ Return the CSRGraph described by the given csv files, without building a
+    WeightedGraph first: vertex_file has a (name, x, y) row per vertex and edge_file a
+    (name, name, weight) row per edge, like 'datasets/cities.csv' and
+    'datasets/city_edges.csv'.
+
+    >>> g = load_csr_graph('datasets/cities.csv', 'datasets/city_edges.csv')
+    >>> len(g.names), len(g.indices)
+    (79, 226)
     """
-    menu_positions = [(x, y) for y in range(0, height) for x in range(0, width)]
+    names, positions = [], []
+    with open(vertex_file) as csv_file:
+        for row in csv.reader(csv_file):
+            names.append(row[0])
+            positions.append((float(row[1]), float(row[2])))
+
+    ids = {name: i for i, name in enumerate(names)}
+    with open(edge_file) as csv_file:
+        edges = [(ids[row[0]], ids[row[1]], float(row[2])) for row in csv.reader(csv_file)]
+
+    return build_csr_graph(names, positions, edges)
+
+
+def load_named_graph(vertex_file: str, edges: Iterable[tuple[str, str, float]],
+                     width: int, height: int) -> WeightedGraph:
+    """ Returns a WeightedGraph whose vertices are read from vertex_file, a csv file of
+    (name, x, y) rows, and whose edges are the given (name, name, weight) edges.
+
+    Vertices get their menu grid positions row by row from the top left of a width by height
+    grid. Vertices beyond the end of the grid get None as their menu position.
+
+    Every vertex name is looked up in an index built while reading vertex_file, and the
+    edges are then added in bulk. Raise a ValueError naming every edge end that is not the
+    name of a vertex, if there are any.
 
+    >>> g = load_named_graph('datasets/cities.csv', [('Fairbanks', 'Vancouver', 700.0)], 8, 10)
+    >>> [(v.name, u.name, w) for v, u, w in g.get_edges()]
+    [('Fairbanks', 'Vancouver', 700.0)]
+    >>> load_named_graph('datasets/cities.csv', [('Fairbanks', 'Atlantis', 1.0)], 8, 10)
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown vertex names: Atlantis
+    """
     g = WeightedGraph()
+    positions = {}
 
-    with open('datasets/cities.csv') as csv_file:
+    with open(vertex_file) as csv_file:
         reader = csv.reader(csv_file)
-        i = 0
-        for row in reader:
-            pos = menu_positions[i]
-            g.add_vertex((float(row[1]), float(row[2])), row[0], pos)
-            i += 1
+        for i, row in enumerate(reader):
+            pos = (float(row[1]), float(row[2]))
+            menu_pos = (i % width, i // width) if i < width * height else None
+            g.add_vertex(pos, row[0], menu_pos)
+            positions.setdefault(row[0], pos)  # the first vertex with a name keeps it
 
-    with open('datasets/city_edges.csv') as csv_file:
-        reader = csv.reader(csv_file)
+    edge_positions = []
+    unknown_names = set()
+    for name1, name2, weight in edges:
+        if name1 in positions and name2 in positions:
+            edge_positions.append((positions[name1], positions[name2], weight))
+        else:
+            unknown_names.update(name for name in (name1, name2) if name not in positions)
+
+    if unknown_names:
+        raise ValueError('unknown vertex names: ' + ', '.join(sorted(unknown_names)))
+
+    g.add_edges(edge_positions)
+    return g
+
+
+def weighted_graph_arrays(graph: WeightedGraph) -> tuple[dict[str, np.ndarray], list[str]]:
+    """ Return the (arrays, names) saved in a snapshot of graph: the vertex positions, the
+    edges in CSR form (see CSRGraph) and the vertex names. The neighbours of every vertex are
+    stored in the order of its neighbours dictionary, and the weights keep their type when
+    they are all integers.
+    """
+    vertices = list(graph.vertices.values())
+    ids = {v: i for i, v in enumerate(vertices)}
+
+    indptr = np.zeros(len(vertices) + 1, dtype=np.int64)
+    np.cumsum([len(v.neighbours) for v in vertices], out=indptr[1:])
+    indices = np.array([ids[u] for v in vertices for u in v.neighbours], dtype=np.int32)
+    weights = np.array([w for v in vertices for w in v.neighbours.values()])
+    if weights.dtype.kind not in 'iu':
+        weights = weights.astype(float)
+
+    arrays = {'positions': np.array([v.pos for v in vertices], dtype=float).reshape(-1),
+              'indptr': indptr, 'indices': indices, 'weights': weights}
+    return arrays, [v.name for v in vertices]
+
+
+def weighted_graph_from_snapshot(snapshot: Snapshot, width: int, height: int) -> WeightedGraph:
+    """ Returns the WeightedGraph saved in snapshot (by weighted_graph_arrays), giving its
+    vertices their menu grid positions like load_named_graph does.
+
+    >>> g = world_cities_graph(8, 10)
+    >>> snapshot = Snapshot('weighted', bytes(32), *weighted_graph_arrays(g))
+    >>> copy = weighted_graph_from_snapshot(snapshot, 8, 10)
+    >>> def summary(graph: WeightedGraph) -> list:
+    ...     return [(v.pos, v.menu_pos, v.name, [(u.pos, w) for u, w in v.neighbours.items()])
+    ...             for v in graph.vertices.values()]
+    >>> summary(copy) == summary(g)
+    True
+    """
+    g = WeightedGraph()
+    positions = snapshot.arrays['positions'].reshape(-1, 2).tolist()
+    for i, (name, (x, y)) in enumerate(zip(snapshot.names, positions)):
+        menu_pos = (i % width, i // width) if i < width * height else None
+        g.add_vertex((x, y), name, menu_pos)
 
-        for row in reader:
-            city1 = [v for v in g.vertices if g.vertices[v].name == row[0]][0]
-            city2 = [v for v in g.vertices if g.vertices[v].name == row[1]][0]
-            distance = float(row[2])
-            g.add_edge(city2, city1, distance)
+    # the graph is new, so nothing was computed from it yet: its neighbours dictionaries can
+    # be filled in directly, in the order they were saved in
+    vertices = list(g.vertices.values())
+    indptr = snapshot.arrays['indptr'].tolist()
+    neighbours = [vertices[j] for j in snapshot.arrays['indices'].tolist()]
+    weights = snapshot.arrays['weights'].tolist()
+    for i, v in enumerate(vertices):
+        v.neighbours = dict(zip(neighbours[indptr[i]:indptr[i + 1]],
+                                weights[indptr[i]:indptr[i + 1]]))
 
     return g
 
 
+def csr_from_snapshot(snapshot: Snapshot) -> CSRGraph:
+    """ Return the CSRGraph saved in snapshot (by weighted_graph_arrays). Its structure arrays
+    are the arrays of the snapshot, so no copy of them is made.
+    """
+    return CSRGraph(snapshot.names, snapshot.arrays['positions'].reshape(-1, 2),
+                    snapshot.arrays['indptr'], snapshot.arrays['indices'],
+                    snapshot.arrays['weights'])
+
+
+def world_cities_graph(width: int, height: int) -> WeightedGraph:
+    """ Returns a WeightedGraph that represents the world map, containing vertices as cities
+    as given in the file containing a list of cities, and edges as given on our source map
+    as stored in edges. The function arguments are there to define the menu grid positions
+    in the selection screen, where the use chooses start, end and blocked locations for
+    levels 3 and 4.
+
+    The graph is loaded from a snapshot of the csv files, which is built again whenever
+    they change.
+    """
+    def build() -> tuple[dict[str, np.ndarray], list[str]]:
+        with open('datasets/city_edges.csv') as csv_file:
+            reader = csv.reader(csv_file)
+            edges = [(row[0], row[1], float(row[2])) for row in reader]
+
+        return weighted_graph_arrays(load_named_graph('datasets/cities.csv', edges, 0, 0))
+
+    snapshot = load_snapshot(snapshot_path('datasets/cities.csv'), 'weighted',
+                             ['datasets/cities.csv', 'datasets/city_edges.csv'], build)
+    return weighted_graph_from_snapshot(snapshot, width, height)
+
+
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
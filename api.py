@@ -11,8 +11,11 @@ import csv
 import json
 import requests
 
-from algorithm_classes_v2 import WeightedGraph
+import randomdata
+from algorithm_classes_v2 import WeightedGraph, load_named_graph, weighted_graph_arrays, \
+    weighted_graph_from_snapshot
 from randomdata import get_countries_to_codes, get_saved_prices
+from snapshots import load_snapshot, snapshot_path
 
 
 def make_price_request(origin_code: str, destination_code: str) -> int:
@@ -57,34 +60,34 @@ def world_countries_graph(width: int, height: int, fetch_new_data: bool = False)
     """ Returns a world map graph where the vertices are countries and edges are the cost to fly
     from one country to the other. If fetch_new_data then the function will make api calls the
     get updated flight data. If not the function will use presaged flight data to be faster.
+
+    The graph of the presaved flight data is loaded from a snapshot, which is built again
+    whenever the csv files or the presaved data change.
     """
-    menu_positions = [(x, y) for y in range(0, height) for x in range(0, width)]
+    if fetch_new_data:
+        return load_countries_graph(get_new_prices_from_api(), width, height)
 
-    g = WeightedGraph()
+    # the saved prices are part of the randomdata module, so the snapshot depends on it too
+    snapshot = load_snapshot(snapshot_path('datasets/countries.csv'), 'weighted',
+                             ['datasets/countries.csv', 'datasets/country_edges.csv',
+                              randomdata.__file__],
+                             lambda: weighted_graph_arrays(
+                                 load_countries_graph(get_saved_prices(), 0, 0)))
+    return weighted_graph_from_snapshot(snapshot, width, height)
 
-    if fetch_new_data:
-        edge_data = get_new_prices_from_api()
-    else:
-        edge_data = get_saved_prices()
-    with open('datasets/countries.csv') as csv_file:
-        reader = csv.reader(csv_file)
-        i = 0
-        for row in reader:
-            pos = menu_positions[i]
-            g.add_vertex((float(row[1]), float(row[2])), row[0], pos)
-            i += 1
 
+def load_countries_graph(edge_data: dict, width: int, height: int) -> WeightedGraph:
+    """ Returns the world map graph of countries read from the csv files, whose edges are
+    the flights with a price in edge_data (see world_countries_graph).
+    """
     with open('datasets/country_edges.csv') as csv_file:
         reader = csv.reader(csv_file)
-        for row in reader:
-            country1_pos = [v for v in g.vertices if g.vertices[v].name == row[0]][0]
-            country2_pos = [v for v in g.vertices if g.vertices[v].name == row[1]][0]
-            price = edge_data[(row[0], row[1])]
-            # check to make sure the price is valid before adding the edge
-            # since if no prices are returned for the flight the price will be -1
-            if price > 0:
-                g.add_edge(country1_pos, country2_pos, price)
-    return g
+        # check to make sure the price is valid before adding the edge
+        # since if no prices are returned for the flight the price will be -1
+        edges = [(row[0], row[1], edge_data[(row[0], row[1])]) for row in reader
+                 if edge_data[(row[0], row[1])] > 0]
+
+    return load_named_graph('datasets/countries.csv', edges, width, height)
 
 
 if __name__ == '__main__':
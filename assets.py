@@ -0,0 +1,95 @@
+"""CSC111 Winter 2021 Course Project: Asset Manager
+
+Authors: Michele Massa, Nischal Nair, Nathan Zavys-Cox
+
+Description: this module contains the AssetManager class, which loads the images shown in the
+pygame menus (maps and backgrounds from the media folder) once, converts them to the pixel
+format of the display so that they are fast to blit, and hands out shared references to them.
+Every image is held by the menus that asked for it, so it can be released once no menu that
+is being displayed needs it anymore.
+
+This file is copyright (c) 2021 Michele Massa, Nischal Nair and Nathan Zavys-Cox.
+"""
+from typing import Hashable
+
+import pygame
+
+
+class AssetManager:
+    """ The class keeping track of the images loaded by the program and of who uses them.
+
+    Instance Attributes:
+        - self.images: dictionary mapping the file path of every loaded image to its surface.
+        - self.owners: dictionary mapping the file path of every loaded image to the set of
+        owners (usually menus) that asked for it and have not released it yet.
+        - self.sizes: dictionary mapping the file path of every loaded image to the number of
+        bytes its pixels take up.
+        - self.total_bytes: the number of bytes the pixels of all the loaded images take up.
+
+    Representation Invariants:
+        - self.images.keys() == self.owners.keys() == self.sizes.keys()
+        - all(self.owners[path] != set() for path in self.owners)
+        - self.total_bytes == sum(self.sizes.values())
+    """
+    images: dict[str, pygame.Surface]
+    owners: dict[str, set[Hashable]]
+    sizes: dict[str, int]
+    total_bytes: int
+
+    def __init__(self) -> None:
+        """ Initialize an asset manager without any image loaded.
+        """
+        self.images = {}
+        self.owners = {}
+        self.sizes = {}
+        self.total_bytes = 0
+
+    def image(self, path: str, owner: Hashable) -> pygame.Surface:
+        """ Return the image stored in the file at path, loading it the first time it is asked
+        for, and record that owner uses it. The returned surface is shared with every other
+        owner of the image, so it must not be drawn on.
+
+        Once the display mode is set, loaded images are converted to the pixel format of the
+        display (keeping their transparency, if they have any).
+        """
+        if path not in self.images:
+            surface = pygame.image.load(path)
+            if pygame.display.get_surface() is not None:
+                if surface.get_flags() & pygame.SRCALPHA:
+                    surface = surface.convert_alpha()
+                else:
+                    surface = surface.convert()
+
+            self.images[path] = surface
+            self.owners[path] = set()
+            self.sizes[path] = surface.get_pitch() * surface.get_height()
+            self.total_bytes += self.sizes[path]
+
+        self.owners[path].add(owner)
+        return self.images[path]
+
+    def release(self, owner: Hashable) -> None:
+        """ Record that owner no longer uses any of the images it asked for, and unload the
+        images that no other owner uses.
+        """
+        for path in [path for path in self.owners if owner in self.owners[path]]:
+            self.owners[path].discard(owner)
+            if self.owners[path] == set():
+                del self.images[path], self.owners[path]
+                self.total_bytes -= self.sizes.pop(path)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136', 'E9999', 'E9998', 'R0913'],
+        'extra-imports': [],
+        'max-nested-blocks': 5
+    })
+
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,704 @@
+""" CSC111 Winter 2021 Course Project: Array-Backed Grid Classes
+
+Authors: Michele Massa, Nischal Nair, Nathan Zavys-Cox
+
+Description: this module contains the GridGraph class, a compact version of the Graph class
+for the rectangular grids used in our program levels 1 and 2. Instead of creating a Vertex
+object (with its own set of neighbours) for every cell, a GridGraph stores the state of every
+cell as a single byte of a flat bytearray, and works out the neighbours of a cell from its
+position on the grid. The GridCell class gives access to a single cell with the same
+attributes as a Vertex, so that a GridGraph can be used anywhere a Graph is. This module also
+contains the functions that create grid graphs from scratch or from a csv maze file.
+
+This file is copyright (c) 2021 Michele Massa, Nischal Nair and Nathan Zavys-Cox.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Iterator, Optional
+from array import array
+from collections import deque
+from collections.abc import Mapping
+import os
+
+import numpy as np
+
+from algorithm_classes import Graph, SEARCH_ENGINES
+from snapshots import load_snapshot, snapshot_path
+
+
+#############
+# CONSTANTS #
+#############
+
+# the byte used to store each vertex state in a GridGraph, and the state stored by each byte
+STATE_CODES = {None: 0, 'blocked': 1, 'start': 2, 'end': 3, 'path': 4}
+CODE_STATES = (None, 'blocked', 'start', 'end', 'path')
+BLOCKED = STATE_CODES['blocked']
+
+# maps every state code to 1 if a search may move into a cell in that state, and 0 otherwise
+UNVISITED_TABLE = bytes(int(code != BLOCKED) for code in range(256))
+
+# the state code of each letter found in a csv maze file, any other letter is a normal cell
+CSV_CODES = {'B': STATE_CODES['blocked'], 'S': STATE_CODES['start'], 'E': STATE_CODES['end']}
+CSV_TABLE = bytes(CSV_CODES.get(chr(i), 0) for i in range(256))
+
+# keeps the separators of a csv maze file and turns every other byte into an 'a', so that
+# every row of single letter cells has the same shape
+CSV_SHAPE_TABLE = bytes(i if chr(i) in ',\n' else ord('a') for i in range(256))
+
+# the number of bytes of a csv maze file read at a time by load_csv_into_grid
+CSV_CHUNK_SIZE = 2 ** 20
+
+# search engines available to grid graphs (the Graph ones plus the array-based ones)
+GRID_SEARCH_ENGINES = {**SEARCH_ENGINES, 'wavefront': 'Wavefront BFS'}
+
+# frontiers smaller than this are expanded cell by cell, as the cost of a few numpy calls
+# outweighs the work of expanding a handful of cells in plain Python
+SMALL_FRONTIER = 64
+
+
+###########
+# Classes #
+###########
+
+
+class GridCell:
+    """ A single cell of a GridGraph, offering the same attributes as a Vertex. Cells are
+    created on demand and hold no data of their own, so any number of them can be created
+    for the same position: they are all equal and share the state stored in the grid.
+
+    Instance Attributes
+      - grid: the GridGraph this cell belongs to
+      - index: the index of this cell in the grid's cells, (y * grid.width) + x
+
+    Representation Invariants
+      - 0 <= self.index < len(self.grid.cells)
+    """
+    grid: GridGraph
+    index: int
+
+    def __init__(self, grid: GridGraph, index: int) -> None:
+        """ Initialize a new cell of the given grid at the given index.
+        """
+        self.grid = grid
+        self.index = index
+
+    @property
+    def pos(self) -> tuple[int, int]:
+        """ The (x, y) position of this cell on the grid.
+        """
+        return self.grid.position(self.index)
+
+    @property
+    def state(self) -> Optional[str]:
+        """ The state of this cell: 'start', 'end', 'blocked', 'path' or None.
+        """
+        return CODE_STATES[self.grid.cells[self.index]]
+
+    @state.setter
+    def state(self, new_state: Optional[str]) -> None:
+        """ Change the state of this cell in the grid.
+        """
+        self.grid.set_state(self.pos, new_state)
+
+    @property
+    def neighbours(self) -> set[GridCell]:
+        """ The set of cells adjacent to this one, blocked or not.
+        """
+        return {GridCell(self.grid, i) for i in self.grid.adjacent_indices(self.index)}
+
+    def __eq__(self, other: object) -> bool:
+        """ Return whether other is a cell of the same grid at the same position.
+        """
+        return isinstance(other, GridCell) and other.grid is self.grid \
+            and other.index == self.index
+
+    def __hash__(self) -> int:
+        """ Return a hash of this cell, so that cells can be stored in sets.
+        """
+        return hash(self.index)
+
+
+class GridVertices(Mapping):
+    """ The read-only dictionary-like view mapping each position of a GridGraph to a GridCell,
+    used as the vertices attribute of a GridGraph.
+
+    Instance Attributes
+      - grid: the GridGraph whose cells are viewed
+    """
+    grid: GridGraph
+
+    def __init__(self, grid: GridGraph) -> None:
+        """ Initialize a new view of the cells of the given grid.
+        """
+        self.grid = grid
+
+    def __getitem__(self, pos: tuple[int, int]) -> GridCell:
+        """ Return the cell at the given position, raising a KeyError if it is not on the grid.
+        """
+        if pos not in self:
+            raise KeyError(pos)
+        return GridCell(self.grid, self.grid.index(pos))
+
+    def __contains__(self, pos: object) -> bool:
+        """ Return whether pos is a position on the grid.
+        """
+        return isinstance(pos, tuple) and len(pos) == 2 \
+            and 0 <= pos[0] < self.grid.width and 0 <= pos[1] < self.grid.height
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        """ Iterate over the positions of the grid, row by row.
+        """
+        return ((x, y) for y in range(self.grid.height) for x in range(self.grid.width))
+
+    def __len__(self) -> int:
+        """ Return the number of cells of the grid.
+        """
+        return len(self.grid.cells)
+
+
+class GridGraph(Graph):
+    """ A Graph whose vertices are the cells of a width by height rectangular grid, each cell
+    being adjacent to the cells directly above, below, left and right of it. The state of
+    every cell is stored as one byte of a flat bytearray (see STATE_CODES), and edges are
+    never stored, so a grid only takes about one byte per cell.
+
+    Instance Attributes:
+      - width: the number of columns of the grid
+      - height: the number of rows of the grid
+      - cells: the state code of every cell, row by row, the cell at (x, y) being stored at
+      index (y * width) + x
+      - vertices: a GridVertices view mapping every position to its GridCell
+
+    Representation Invariants:
+      - self.width > 0 and self.height > 0
+      - len(self.cells) == self.width * self.height
+      - all(code < len(CODE_STATES) for code in self.cells)
+    """
+    width: int
+    height: int
+    cells: bytearray
+    vertices: GridVertices
+    # Private Instance Attributes:
+    #   - _labels: the component label of every cell (-1 for blocked cells), as computed by
+    #   _label_array, used instead of the _component_labels dictionary of Graph.
+    #   - _labels_version: the version of the grid _labels was computed for.
+    _labels: array
+    _labels_version: int
+
+    def __init__(self, width: int, height: int, cells: Optional[bytearray] = None) -> None:
+        """ Initialize a grid graph of the given dimensions, with the given state codes or with
+        every cell in the normal (None) state.
+
+        Preconditions:
+          - width > 0 and height > 0
+          - cells is None or len(cells) == width * height
+        """
+        Graph.__init__(self)
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width * height) if cells is None else cells
+        self.vertices = GridVertices(self)
+        self._labels = array('i')
+        self._labels_version = -1
+
+    def index(self, pos: tuple[int, int]) -> int:
+        """ Return the index of the cell at pos in self.cells.
+        """
+        return pos[1] * self.width + pos[0]
+
+    def position(self, index: int) -> tuple[int, int]:
+        """ Return the position of the cell stored at the given index of self.cells.
+        """
+        return (index % self.width, index // self.width)
+
+    def adjacent_indices(self, index: int) -> list[int]:
+        """ Return the indices of the cells adjacent to the cell at the given index.
+
+        >>> GridGraph(3, 2).adjacent_indices(1)
+        [4, 0, 2]
+        """
+        width = self.width
+        adjacent = []
+        if index >= width:
+            adjacent.append(index - width)
+        if index + width < len(self.cells):
+            adjacent.append(index + width)
+        if index % width > 0:
+            adjacent.append(index - 1)
+        if index % width < width - 1:
+            adjacent.append(index + 1)
+        return adjacent
+
+    def add_vertex(self, position: tuple[int, int], state: Optional[str] = None) -> None:
+        """ Set the state of the cell at the given position: the cells of a grid graph
+        always exist, so this is all adding a vertex can do.
+
+        Raise a ValueError if the position is not on the grid.
+        """
+        self.set_state(position, state)
+
+    def add_edge(self, pos1: tuple[float, float], pos2: tuple[float, float]) -> None:
+        """ Do nothing if the cells at the two positions are adjacent, as the edges of a grid
+        graph are implied by the grid.
+
+        Raise a ValueError otherwise, since no other edge can be added to a grid graph.
+        """
+        if pos1 not in self.vertices or pos2 not in self.vertices \
+                or abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1]) != 1:
+            raise ValueError
+
+    def set_state(self, pos: tuple[int, int], state: Optional[str]) -> None:
+        """ Change the state of the cell at pos.
+
+        Raise a ValueError if pos is not on the grid.
+        """
+        if pos not in self.vertices:
+            raise ValueError
+
+        i = self.index(pos)
+        old_state = CODE_STATES[self.cells[i]]
+        self.cells[i] = STATE_CODES[state]
+        self.record_state_change(pos, old_state, state)
+
+    def connected(self, pos1: tuple[int, int], pos2: tuple[int, int]) -> bool:
+        """ Return whether the cells at pos1 and pos2 are connected through cells that are not
+        blocked, exactly like Graph.connected, using an array of component labels.
+
+        >>> g = GridGraph(3, 1)
+        >>> g.connected((0, 0), (2, 0))
+        True
+        >>> g.vertices[(1, 0)].state = 'blocked'
+        >>> g.connected((0, 0), (2, 0))
+        False
+        """
+        if pos1 in self.vertices and pos2 in self.vertices:
+            if pos1 == pos2:
+                return True
+            labels = self._label_array()
+            label = labels[self.index(pos1)]
+            return label != -1 and labels[self.index(pos2)] == label
+        else:
+            return False
+
+    def component_labels(self) -> dict[tuple[int, int], int]:
+        """ Return a dictionary mapping the position of every cell that is not blocked to
+        the label of its connected component, as in Graph.component_labels.
+        """
+        labels = self._label_array()
+        return {self.position(i): label for i, label in enumerate(labels) if label != -1}
+
+    def _label_array(self) -> array:
+        """ Return an array giving the component label of every cell (-1 for blocked cells),
+        computed with a single sweep and kept until the version of the grid changes.
+        """
+        if self._labels_version != self.version:
+            cells = self.cells
+            labels = array('i', [-1]) * len(cells)
+            next_label = 0
+            for i in range(len(cells)):
+                if labels[i] == -1 and cells[i] != BLOCKED:
+                    self._flood_label(labels, i, next_label)
+                    next_label += 1
+
+            self._labels = labels
+            self._labels_version = self.version
+
+        return self._labels
+
+    def _flood_label(self, labels: array, index: int, label: int) -> None:
+        """ Give label to the cell at index and to every cell connected to it in labels, which
+        must hold -1 for all of these cells.
+        """
+        cells = self.cells
+        labels[index] = label
+        stack = [index]
+        while stack:
+            for j in self.adjacent_indices(stack.pop()):
+                if labels[j] == -1 and cells[j] != BLOCKED:
+                    labels[j] = label
+                    stack.append(j)
+
+    def breadth_first_search(self, start_pos: tuple, end_pos: tuple) -> Optional[list]:
+        """ Returns the shortest path between two cells, if there exists such a path, exactly
+        like Graph.breadth_first_search, working on cell indices instead of positions.
+
+        Preconditions
+          - self.connected(start_pos, end_pos)
+
+        >>> g = GridGraph(3, 2)
+        >>> g.vertices[(1, 0)].state = 'blocked'
+        >>> g.breadth_first_search((0, 0), (2, 0))
+        [(0, 1), (1, 1), (2, 1)]
+        """
+        if start_pos == end_pos:
+            return []
+
+        cells = self.cells
+        start, end = self.index(start_pos), self.index(end_pos)
+
+        # parents holds the index each cell was reached from (-1 for cells not reached yet),
+        # which takes 4 bytes per cell however much of the grid is explored
+        parents = array('i', [-1]) * len(cells)
+        parents[start] = start
+        que = deque([start])
+
+        width, size = self.width, len(cells)
+        while que:
+            i = que.popleft()
+            x = i % width
+            # the adjacent cells are worked out inline, as this loop runs once per cell
+            for j in (i - width if i >= width else -1, i + width if i + width < size else -1,
+                      i - 1 if x > 0 else -1, i + 1 if x < width - 1 else -1):
+                if j != -1 and parents[j] == -1 and cells[j] != BLOCKED:
+                    parents[j] = i
+                    if j == end:
+                        return self._rebuild_interior(parents, start, end)
+                    que.append(j)
+
+        return None
+
+    def _rebuild_interior(self, parents: array, start: int, end: int) -> list[tuple[int, int]]:
+        """ Return the positions of the cells strictly between start and end on the path
+        recorded in parents, an array giving the index each cell was reached from.
+        """
+        path = []
+        i = parents[end]
+        while i != start:
+            path.append(self.position(i))
+            i = parents[i]
+
+        path.reverse()
+        return path
+
+    def wavefront_distances(self, start_pos: tuple[int, int],
+                            end_pos: Optional[tuple[int, int]] = None) -> np.ndarray:
+        """ Return a height by width array giving the number of steps needed to go from
+        start_pos to every cell (-1 for the cells that cannot be reached), never moving into
+        a blocked cell. If end_pos is given, the expansion stops as soon as it is reached, so
+        only the cells closer to start_pos than end_pos are guaranteed to have a distance.
+
+        This is a Breadth First Search done one whole level (wavefront) at a time: each step
+        shifts the cells of the frontier one cell up, down, left and right, keeps the cells
+        that are neither blocked nor visited, and records the step number as their distance.
+        Large frontiers are shifted with numpy index arithmetic, while small ones (long
+        narrow corridors) are expanded in plain Python, where numpy would only add overhead.
+
+        >>> g = GridGraph(3, 2)
+        >>> g.vertices[(1, 0)].state = 'blocked'
+        >>> g.wavefront_distances((0, 0)).tolist()
+        [[0, -1, 4], [1, 2, 3]]
+        """
+        size, width = len(self.cells), self.width
+        start = self.index(start_pos)
+        end = -1 if end_pos is None else self.index(end_pos)
+
+        # the array and bytearray are shared with numpy views, so that both plain Python and
+        # numpy can read and write them cheaply
+        dist = array('i', [-1]) * size
+        dist_view = np.frombuffer(dist, dtype=np.int32)
+        unvisited = bytearray(self.cells).translate(UNVISITED_TABLE)
+        unvisited_view = np.frombuffer(unvisited, dtype=np.uint8)
+
+        dist[start], unvisited[start] = 0, 0
+        frontier, step = [start], 0
+        while len(frontier) > 0 and (end == -1 or dist[end] == -1):
+            if len(frontier) < SMALL_FRONTIER:
+                frontier = frontier if isinstance(frontier, list) else frontier.tolist()
+                step, frontier = _expand_small_frontiers(frontier, step, end, width, unvisited,
+                                                         dist)
+            else:
+                step += 1
+                columns = frontier % width
+                shifted = np.concatenate((frontier[frontier >= width] - width,
+                                          frontier[frontier < size - width] + width,
+                                          frontier[columns > 0] - 1,
+                                          frontier[columns < width - 1] + 1))
+                frontier = np.unique(shifted[unvisited_view[shifted] == 1])
+                unvisited_view[frontier] = 0
+                dist_view[frontier] = step
+
+        return dist_view.reshape(self.height, width)
+
+    def wavefront_search(self, start_pos: tuple[int, int],
+                         end_pos: tuple[int, int]) -> tuple[np.ndarray, Optional[list]]:
+        """ Return the distance field computed by wavefront_distances from start_pos (stopped
+        once end_pos is reached) along with the shortest path between the two cells, in the
+        same format as breadth_first_search (None if there is no path).
+
+        The path is rebuilt by walking back from end_pos, each time moving to an adjacent
+        cell whose distance is one step smaller.
+
+        >>> g = GridGraph(3, 2)
+        >>> g.vertices[(1, 0)].state = 'blocked'
+        >>> g.wavefront_search((0, 0), (2, 0))[1]
+        [(0, 1), (1, 1), (2, 1)]
+        """
+        dist = self.wavefront_distances(start_pos, end_pos)
+        if start_pos == end_pos:
+            return dist, []
+        elif dist[end_pos[1], end_pos[0]] == -1:
+            return dist, None
+
+        # a memoryview reads single distances much faster than indexing the numpy array
+        flat = memoryview(dist.ravel())
+        path = []
+        i = self.index(end_pos)
+        while flat[i] > 1:
+            i = next(j for j in self.adjacent_indices(i) if flat[j] == flat[i] - 1)
+            path.append(self.position(i))
+
+        path.reverse()
+        return dist, path
+
+    def _compute_distance_field(self, end_pos: tuple[int, int]) -> np.ndarray:
+        """ Compute the distance field of end_pos described in Graph.distance_field, as the
+        height by width array of wavefront_distances, where -1 marks the cells that are blocked
+        or cannot reach end_pos.
+        """
+        if self.cells[self.index(end_pos)] == BLOCKED:
+            return np.full((self.height, self.width), -1, dtype=np.int32)
+        return self.wavefront_distances(end_pos)
+
+    def flow_field_search(self, start_pos: tuple, end_pos: tuple) -> Optional[list]:
+        """ Returns the shortest path between two cells, like Graph.flow_field_search, by
+        descending the distance field array of end_pos.
+
+        >>> g = GridGraph(3, 2)
+        >>> g.vertices[(1, 0)].state = 'blocked'
+        >>> g.flow_field_search((0, 0), (2, 0))
+        [(0, 1), (1, 1), (2, 1)]
+        >>> g.flow_field_search((1, 1), (2, 0))
+        [(2, 1)]
+        """
+        if start_pos == end_pos:
+            return []
+
+        field = memoryview(self.distance_field(end_pos).ravel())
+        steps = [j for j in self.adjacent_indices(self.index(start_pos)) if field[j] != -1]
+        if steps == []:
+            return None
+
+        path = [min(steps, key=field.__getitem__)]
+        while field[path[-1]] > 0:
+            distance = field[path[-1]]
+            path.append(next(j for j in self.adjacent_indices(path[-1])
+                             if field[j] == distance - 1))
+
+        return [self.position(i) for i in path[:-1]]
+
+    def shortest_path(self, start_pos: tuple, end_pos: tuple,
+                      engine: str = 'bfs') -> Optional[list]:
+        """ Returns the shortest path between two cells computed with the given search engine,
+        like Graph.shortest_path, with the array-based engines of grids also available.
+
+        Preconditions
+          - engine in GRID_SEARCH_ENGINES
+        """
+        if engine == 'wavefront':
+            return self.wavefront_search(start_pos, end_pos)[1]
+        else:
+            return Graph.shortest_path(self, start_pos, end_pos, engine)
+
+    def get_vertices(self) -> set[GridCell]:
+        """ Return the set of the cells of this grid.
+        """
+        return {GridCell(self, i) for i in range(len(self.cells))}
+
+    def _open_neighbours(self, pos: tuple[int, int]) -> list[tuple[int, int]]:
+        """ Return the positions of the cells adjacent to the cell at pos that are not
+        blocked, i.e. the cells a search is allowed to move into from pos.
+        """
+        cells = self.cells
+        return [self.position(j) for j in self.adjacent_indices(self.index(pos))
+                if cells[j] != BLOCKED]
+
+
+####################
+# Helper Functions #
+####################
+
+
+def _expand_small_frontiers(frontier: list[int], step: int, end: int, width: int,
+                            unvisited: bytearray, dist: array) -> tuple[int, Any]:
+    """ Expand frontier one level at a time in plain Python, recording distances in dist, for
+    as long as it stays smaller than SMALL_FRONTIER and the end cell (-1 for none) is not reached.
+    Return the last step done and the frontier left, as a numpy array if it grew large.
+    """
+    size = len(unvisited)
+    while 0 < len(frontier) < SMALL_FRONTIER and (end == -1 or dist[end] == -1):
+        step += 1
+        candidates = []
+        for i in frontier:
+            x = i % width
+            if i >= width and unvisited[i - width]:
+                candidates.append(i - width)
+            if i + width < size and unvisited[i + width]:
+                candidates.append(i + width)
+            if x > 0 and unvisited[i - 1]:
+                candidates.append(i - 1)
+            if x < width - 1 and unvisited[i + 1]:
+                candidates.append(i + 1)
+
+        frontier = []
+        for j in candidates:
+            if unvisited[j]:
+                unvisited[j] = 0
+                dist[j] = step
+                frontier.append(j)
+
+    if len(frontier) >= SMALL_FRONTIER:
+        return step, np.array(frontier)
+    return step, frontier
+
+
+def create_blank_grid(width: int, height: int) -> GridGraph:
+    """ Given a user specified width and height, returns a grid graph with all cell states
+    set to None, the GridGraph equivalent of create_blank_graph.
+
+    Preconditions
+      - width > 0
+      - height > 0
+
+    >>> len(create_blank_grid(4, 3).vertices)
+    12
+    """
+    return GridGraph(width, height)
+
+
+def load_csv_into_grid(file_name: str,
+                       progress: Optional[Callable[[int, int], None]] = None) -> GridGraph:
+    """ Given a csv file with map data, converts it to and returns a grid graph, the
+    GridGraph equivalent of load_csv_into_graph: every cell of the file containing a "B" is a
+    blocked cell, "S" a start cell, "E" an end cell, and any other letter a normal cell.
+
+    The file is read CSV_CHUNK_SIZE bytes at a time and the state codes of every chunk are
+    written straight into the cells of the grid, which are allocated once from the length of
+    the first row. The edges of a grid are implied, so beyond its cells, loading a maze only
+    takes memory for the chunk being read. If progress is given, it is called with the
+    number of bytes read so far and the size of the file after every chunk, and once more
+    with both equal to the size of the file when the whole file has been loaded.
+
+    Preconditions
+      - every row of the file has the same number of cells
+
+    >>> g = load_csv_into_grid('datasets/MAP1_csv.csv')
+    >>> (g.width, g.height, g.vertices[(0, 0)].state, g.vertices[(1, 0)].state)
+    (9, 9, 'blocked', None)
+    >>> reports = []
+    >>> g = load_csv_into_grid('datasets/MAP2_csv.csv', lambda done, total: reports.append(done))
+    >>> reports
+    [800, 800]
+    """
+    total = os.path.getsize(file_name)
+
+    with open(file_name, 'rb') as csv_file:
+        first_line = csv_file.readline()
+        while first_line != b'' and csv_row_codes(first_line) is None:
+            first_line = csv_file.readline()
+        if first_line == b'':
+            raise ValueError  # there is no row in the file
+
+        first_row = csv_row_codes(first_line)
+        width = len(first_row)
+        # rows usually all take as many bytes as the first one, which gives the grid's height
+        cells = bytearray(width * -(-total // len(first_line)))
+        cells[:width] = first_row
+        filled, rest = width, b''
+
+        for chunk in iter(lambda: csv_file.read(CSV_CHUNK_SIZE), b''):
+            block = rest + chunk
+            cut = block.rfind(b'\n') + 1
+            rest = block[cut:]
+            codes = _csv_block_codes(block[:cut], width)
+            cells[filled:filled + len(codes)] = codes
+            filled += len(codes)
+            if progress is not None:
+                progress(csv_file.tell() - len(rest), total)
+
+        # the last row may not end with a line break
+        codes = _csv_block_codes(rest + b'\n', width) if rest != b'' else b''
+        cells[filled:filled + len(codes)] = codes
+        filled += len(codes)
+        if progress is not None:
+            progress(total, total)
+
+    del cells[filled:]
+    return GridGraph(width, filled // width, cells)
+
+
+def _csv_block_codes(block: bytes, width: int) -> bytes:
+    """ Return the state codes of the cells of block, a sequence of whole lines (each ending
+    with a line break) of a csv maze file whose rows have width cells.
+    """
+    if b'\r' in block:
+        block = block.replace(b'\r\n', b'\n')
+
+    # every line of the block is blank or made of width single letter cells exactly when the
+    # rows of that shape found in the shape of the block and the blank lines fill it up
+    shape, row_shape = block.translate(CSV_SHAPE_TABLE), b'a' + b',a' * (width - 1) + b'\n'
+    rows = shape.count(row_shape)
+    if rows * len(row_shape) + shape.count(b'\n') - rows == len(shape):
+        return block.translate(CSV_TABLE, b',\n')
+
+    codes = (csv_row_codes(line) for line in block.splitlines())
+    return b''.join(row for row in codes if row is not None)
+
+
+def csv_row_codes(line: bytes) -> Optional[bytes]:
+    """ Return the state codes of the cells of a line of a csv maze file, or None if the line
+    is blank (and skipped, as csv.reader does).
+
+    >>> list(csv_row_codes(b'B,P,S,E\\r\\n'))
+    [1, 0, 2, 3]
+    >>> list(csv_row_codes(b'P,,BB, B\\n'))
+    [0, 0, 0, 0]
+    >>> csv_row_codes(b'\\n') is None
+    True
+    """
+    fields = line.rstrip(b'\r\n').split(b',')
+    if fields == [b'']:
+        return None
+
+    if all(len(field) == 1 for field in fields):
+        # every cell is a single letter, translate them all at once
+        return b''.join(fields).translate(CSV_TABLE)
+    else:
+        return bytes(CSV_CODES.get(field.decode('latin-1'), 0) for field in fields)
+
+
+def load_grid_snapshot(file_name: str,
+                       progress: Optional[Callable[[int, int], None]] = None) -> GridGraph:
+    """ Returns the grid graph of the csv maze file_name, exactly like load_csv_into_grid,
+    but loaded from a snapshot of the file (built again whenever the file changes). progress
+    is passed on to load_csv_into_grid when the snapshot is built.
+
+    >>> g = load_grid_snapshot('datasets/MAP1_csv.csv')
+    >>> g.cells == load_csv_into_grid('datasets/MAP1_csv.csv').cells
+    True
+    """
+    def build() -> tuple[dict[str, np.ndarray], list[str]]:
+        grid = load_csv_into_grid(file_name, progress)
+        arrays = {'shape': np.array([grid.width, grid.height], dtype=np.int64),
+                  'cells': np.frombuffer(grid.cells, dtype=np.uint8)}
+        return arrays, []
+
+    snapshot = load_snapshot(snapshot_path(file_name), 'grid', [file_name], build)
+    width, height = snapshot.arrays['shape'].tolist()
+    # the cells of a grid change as the user edits it, so they are copied out of the snapshot
+    return GridGraph(width, height, bytearray(snapshot.arrays['cells']))
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136', 'E9999', 'E9998', 'R0913'],
+        'extra-imports': [],
+        'max-nested-blocks': 5
+    })
+
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
@@ -35,7 +35,10 @@ def run_sim() -> None:
     gui = program.Program()  # start the Program class
 
     while gui.running:
-        gui.curr_menu.display_menu()
+        shown_menu = gui.curr_menu
+        shown_menu.display_menu()
+        # the images of the menu just left are unloaded until a menu asks for them again
+        gui.assets.release(shown_menu)
         gui.program_menu_loop()
 
     # Quit the pygame window once the running attribute becomes False
@@ -14,12 +14,13 @@ This file is copyright (c) 2021 Michele Massa, Nischal Nair and Nathan Zavys-Cox
 ###########
 
 from typing import Optional
-import csv
 import pygame
 from pygame.colordict import THECOLORS
-from algorithm_classes import create_blank_graph, load_csv_into_graph, Graph
-from algorithm_classes_v2 import world_cities_graph, WeightedGraph
+from algorithm_classes import Graph
+from algorithm_classes_v2 import world_cities_graph, WeightedGraph, WEIGHTED_SEARCH_ENGINES
 from api import world_countries_graph
+from grid_classes import create_blank_grid, load_grid_snapshot, GRID_SEARCH_ENGINES
+from packed_mazes import load_maze_tile, MAZE_SUFFIX
 
 
 #############
@@ -89,14 +90,22 @@ class Menu:
         """
         self.program.draw_title_text(25, '->', (self.user_pos.x, self.user_pos.y))
 
+    def start_display(self) -> None:
+        """ Function marking this menu as the one being displayed, and having its first frame
+        drawn straight away.
+        """
+        self.run_display = True
+        self.program.request_redraw()
+
     def blit_screen(self) -> None:
         """ Function in charge of loading and updating the text and other widgets being
-        displayed on the current pygame window.
+        displayed on the current pygame window, and of pacing the frames of the menu loops.
         """
         # align program.display to program.window
         self.program.window.blit(self.program.display, (0, 0))
         pygame.display.update()  # update any changes the pygame window has undergone
         self.program.reset_keys()  # reset all keyboard keys state to not active (False)
+        self.program.end_frame()  # wait for the next frame, or for the next input
 
 
 ###################
@@ -157,7 +166,7 @@ class MainMenu(Menu):
         """ Function controlling the main loop in charge of displaying and updating
         the MainMenu screen being shown to the user.
         """
-        self.run_display = True
+        self.start_display()
         while self.run_display:
             self.program.catch_events_menu()  # detect events
             self.check_input()  # receive user input
@@ -319,7 +328,7 @@ class SpMenu(Menu):
         """ Function controlling the main loop in charge of displaying and updating
         the SpMenu screen being shown to the user.
         """
-        self.run_display = True
+        self.start_display()
         while self.run_display:
             self.program.catch_events_menu()  # detect events
             self.check_input()  # receive user input
@@ -445,7 +454,7 @@ class SimpleProgramRun(Menu):
     and the simple program's simulation.
 
     Instance Attributes:
-        - self.graph: the standard graph object representing a space to be traversed.
+        - self.graph: the grid graph object representing a space to be traversed.
         - self.grid_dimensions: the tuple of ints keeping track of the dimension of the grid
         to be drawn on the user's screen based on the input from the previous menu window.
         - self.start_pos: the tuple of ints representing the starting position of the user on
@@ -455,8 +464,11 @@ class SimpleProgramRun(Menu):
         - self.show_message: bool keeping track of whether or not the user has tried to make
         and invalid shortest path computation (unable to go from self.start_pos to
         self.end_pos), triggering the showing of an alert notifying user of the invalid input.
+        - self.search_engine: str naming the search engine used to compute the path (cycled
+        through with the horizontal arrow keys).
 
     Representation Invariants:
+        - self.search_engine in GRID_SEARCH_ENGINES
         - 5 <= self.grid_dimensions[0] <= 20
         - 5 <= self.grid_dimensions[1] <= 20
     """
@@ -468,6 +480,7 @@ class SimpleProgramRun(Menu):
     start_pos = Optional[tuple[int, int]]
     end_pos = Optional[tuple[int, int]]
     show_message: bool
+    search_engine: str
 
     def __init__(self, program: pygame.display, grid_dimensions: tuple[int, int]) -> None:
         """ Initialize a SimpleProgramRun object and its attributes along with the given
@@ -475,19 +488,19 @@ class SimpleProgramRun(Menu):
         display_menu method loop.
         """
         Menu.__init__(self, program)
-        self.graph = create_blank_graph(grid_dimensions[0],
-                                        grid_dimensions[1])
+        self.graph = create_blank_grid(grid_dimensions[0], grid_dimensions[1])
         self.grid_dimensions = grid_dimensions
         self.start_pos = None
         self.end_pos = None
 
         self.show_message = False
+        self.search_engine = 'bfs'
 
     def display_menu(self) -> None:
         """ Function controlling the main loop in charge of displaying and updating
         the SimpleProgramRun screen being shown to the user.
         """
-        self.run_display = True
+        self.start_display()
         while self.run_display:
             self.program.catch_events_menu()  # detect events
             self.check_input()  # receive user input
@@ -497,9 +510,11 @@ class SimpleProgramRun(Menu):
             pygame.draw.rect(self.program.display, THECOLORS['gray11'], [0, 0, 800, 40])
             pygame.draw.rect(self.program.display, THECOLORS['cyan'], [740, 0, 60, 40])
             self.program.draw_title_text(20, "Simple Program Run", (120, 20), 'white')
+            engine_text = 'Engine: ' + GRID_SEARCH_ENGINES[self.search_engine] + ' (LEFT/RIGHT)'
+            self.program.draw_title_text(14, engine_text, (420, 20), 'white')
 
             instructions1 = "1) Click on cells to modify this graph, press ENTER to find the best" \
-                            " BFS path from start to end"
+                            " path from start to end"
             instructions2 = "2) Left click: block cell; Right click: start vertex," \
                             " Middle click: end vertex"
             self.program.draw_title_text(16, instructions1, (self.mid_coords[0], 55))
@@ -526,6 +541,10 @@ class SimpleProgramRun(Menu):
             self.program.curr_menu = self.program.simple_program_menu
             self.run_display = False
 
+        # horizontal arrow keys cycle through the available search engines
+        if self.program.left_key or self.program.right_key:
+            self.search_engine = cycle_engine(self.search_engine, self.program.right_key)
+
         # handle mouse input
 
         if self.program.left_click[0]:
@@ -571,15 +590,16 @@ class SimpleProgramRun(Menu):
                 self.draw_path()
 
     def draw_path(self) -> None:
-        """ Method in charge of making the call to the Breadth First Search algorithm
-        which calculates the path to be followed by the user, and displaying this path on
-        the SimpleProgramRun screen by mutating the user's graph.
+        """ Method in charge of making the call to the selected search algorithm (Breadth
+        First Search by default) which calculates the path to be followed by the user, and
+        displaying this path on the SimpleProgramRun screen by mutating the user's graph.
         """
-        path_to_follow = self.graph.breadth_first_search(self.start_pos, self.end_pos)
-
-        if path_to_follow is None:
+        # the graph's component index tells us in constant time when there is no path at all
+        if not self.graph.connected(self.start_pos, self.end_pos):
             self.show_message = True
-        else:  # path_to_follow is a valid path
+        else:  # there is a valid path to follow
+            path_to_follow = self.graph.shortest_path(self.start_pos, self.end_pos,
+                                                      self.search_engine)
             for vertex in path_to_follow:
                 self.graph.vertices[vertex].state = 'path'
 
@@ -650,12 +670,12 @@ class MazeProgramMenu(Menu):
         the MazeProgramMEnu screen being shown to the user.
         """
         # load images
-        map_1_img = pygame.image.load('media/MAP1_pic.png')
-        map_2_img = pygame.image.load('media/MAP2_pic.png')
-        map_3_img = pygame.image.load('media/MAP3_pic.png')
-        map_4_img = pygame.image.load('media/MAP4_pic.png')
+        map_1_img = self.program.assets.image('media/MAP1_pic.png', self)
+        map_2_img = self.program.assets.image('media/MAP2_pic.png', self)
+        map_3_img = self.program.assets.image('media/MAP3_pic.png', self)
+        map_4_img = self.program.assets.image('media/MAP4_pic.png', self)
 
-        self.run_display = True
+        self.start_display()
         while self.run_display:
             self.program.catch_events_menu()  # detect events
             self.check_input()  # receive user input
@@ -775,7 +795,7 @@ class MazeProgramRun(Menu):
     and the maze program's simulation.
 
     Instance Attributes:
-        - self.graph: the standard graph object representing a space to be traversed.
+        - self.graph: the grid graph object representing a space to be traversed.
         - self.maze_dimensions: the tuple of ints keeping track of the dimension of the grid
         to be drawn on the user's screen based on the user's selected preset graph.
         - self.start_pos: the tuple of ints representing the starting position of the user on
@@ -788,8 +808,11 @@ class MazeProgramRun(Menu):
         - self.map_4: bool representing the case of the user selecting the Map 4 preset in the
         previous window. If this attribute is True, special characteristics are given to the
         simulation.
+        - self.search_engine: str naming the search engine used to compute the path (cycled
+        through with the horizontal arrow keys).
 
     Representation Invariants:
+        - self.search_engine in GRID_SEARCH_ENGINES
         - 5 <= self.maze_dimensions[0] <= 20
         - 5 <= self.maze_dimensions[1] <= 20
     """
@@ -802,6 +825,7 @@ class MazeProgramRun(Menu):
     end_pos: Optional[tuple[int, int]]
     show_message: bool
     map_4: bool
+    search_engine: str
 
     def __init__(self, program: pygame.display, maze_file: str, maze_dim: tuple[int, int]) -> None:
         """ Initialize a MazeProgramRun object and its attributes along with the given
@@ -810,7 +834,11 @@ class MazeProgramRun(Menu):
         """
         Menu.__init__(self, program)
 
-        self.graph = load_csv_into_graph(maze_file)
+        if maze_file.endswith(MAZE_SUFFIX):
+            # packed mazes can be far too large to load, only the tile on screen is loaded
+            self.graph = load_maze_tile(maze_file, 0, 0, maze_dim[0], maze_dim[1])
+        else:
+            self.graph = load_grid_snapshot(maze_file, self.program.draw_progress)
         self.maze_dimensions = maze_dim
 
         self.start_pos = None
@@ -818,12 +846,13 @@ class MazeProgramRun(Menu):
 
         self.show_message = False
         self.map_4 = False
+        self.search_engine = 'bfs'
 
     def display_menu(self) -> None:
         """ Function controlling the main loop in charge of displaying and updating
         the MazeProgramRun screen being shown to the user.
         """
-        self.run_display = True
+        self.start_display()
         while self.run_display:
             self.program.catch_events_menu()  # detect events
             self.check_input()  # receive user input
@@ -833,9 +862,11 @@ class MazeProgramRun(Menu):
             pygame.draw.rect(self.program.display, THECOLORS['gray11'], [0, 0, 800, 40])
             pygame.draw.rect(self.program.display, THECOLORS['cyan'], [740, 0, 60, 40])
             self.program.draw_title_text(20, "Maze Program Run", (110, 20), 'white')
+            engine_text = 'Engine: ' + GRID_SEARCH_ENGINES[self.search_engine] + ' (LEFT/RIGHT)'
+            self.program.draw_title_text(14, engine_text, (420, 20), 'white')
 
             instructions1 = "1) Click on cells to modify this graph, press ENTER to find the best" \
-                            " BFS path from start to end"
+                            " path from start to end"
             instructions2 = "2) Left click: block vertex; Right click: start vertex," \
                             " Middle click: end vertex"
             self.program.draw_title_text(16, instructions1, (self.mid_coords[0], 55))
@@ -843,7 +874,7 @@ class MazeProgramRun(Menu):
 
             # recognize special case MAP4
             if self.map_4:
-                bg = pygame.image.load('media/MAP4_BG_pic.png')
+                bg = self.program.assets.image('media/MAP4_BG_pic.png', self)
                 self.program.display.blit(bg, (50, 100))
                 self.program.draw_invis_grid(self.maze_dimensions, self.graph)
                 if self.program.enter_key:
@@ -873,6 +904,10 @@ class MazeProgramRun(Menu):
             self.program.curr_menu = self.program.maze_program_menu
             self.run_display = False
 
+        # horizontal arrow keys cycle through the available search engines
+        if self.program.left_key or self.program.right_key:
+            self.search_engine = cycle_engine(self.search_engine, self.program.right_key)
+
         # handle mouse input
 
         if self.program.left_click[0]:
@@ -917,15 +952,16 @@ class MazeProgramRun(Menu):
                 self.draw_path()
 
     def draw_path(self) -> None:
-        """ Method in charge of making the call to the Breadth First Search algorithm
-        which calculates the path to be followed by the user, and displaying this path on
-        the MazeProgramRun screen by mutating the user's graph.
+        """ Method in charge of making the call to the selected search algorithm (Breadth
+        First Search by default) which calculates the path to be followed by the user, and
+        displaying this path on the MazeProgramRun screen by mutating the user's graph.
         """
-        path_to_follow = self.graph.breadth_first_search(self.start_pos, self.end_pos)
-
-        if path_to_follow is None:
+        # the graph's component index tells us in constant time when there is no path at all
+        if not self.graph.connected(self.start_pos, self.end_pos):
             self.show_message = True
-        else:  # path_to_follow is a valid path
+        else:  # there is a valid path to follow
+            path_to_follow = self.graph.shortest_path(self.start_pos, self.end_pos,
+                                                      self.search_engine)
             for vertex in path_to_follow:
                 self.graph.vertices[vertex].state = 'path'
 
@@ -975,7 +1011,7 @@ class AirProgramMenu(Menu):
         """ Function controlling the main loop in charge of displaying and updating
         the AirProgramMenu screen being shown to the user.
         """
-        self.run_display = True
+        self.start_display()
         while self.run_display:
             self.program.catch_events_menu()  # detect events
             self.check_input()  # receive user input
@@ -1005,7 +1041,7 @@ class AirProgramMenu(Menu):
         """
         if self.program.back_key:
             # reset graph
-            self.graph = world_cities_graph(AR_DIM[0], AR_DIM[1])
+            self.graph.reset_states()
             self.start_pos = None
             self.end_pos = None
 
@@ -1018,41 +1054,42 @@ class AirProgramMenu(Menu):
             pos = self.program.left_click[1]
             in_grid_cell_num = ((pos[0] - 50) // (700 // self.ar_grid_dimensions[0]),
                                 ((pos[1] - 100) // (700 // self.ar_grid_dimensions[1])))
-            pixel_pos = get_air_file_pos(in_grid_cell_num[0], in_grid_cell_num[1])
+            vertex = self.graph.vertex_at_menu_pos(in_grid_cell_num)
             coord_number = find_coord(self.ar_grid_dimensions, in_grid_cell_num)
             number_of_cells = self.ar_grid_dimensions[0] * self.ar_grid_dimensions[1]
 
-            if valid_cell(self.ar_grid_dimensions, in_grid_cell_num, coord_number, number_of_cells):
+            if valid_cell(self.ar_grid_dimensions, in_grid_cell_num, coord_number,
+                          number_of_cells) and vertex is not None:
                 # change vertex state to 'blocked'
-                self.graph.vertices[pixel_pos].state = 'blocked'
+                vertex.state = 'blocked'
 
         elif self.program.right_click[0]:
             pos = self.program.right_click[1]
             in_grid_cell_num = ((pos[0] - 50) // (700 // self.ar_grid_dimensions[0]),
                                 ((pos[1] - 100) // (700 // self.ar_grid_dimensions[1])))
-            pixel_pos = get_air_file_pos(in_grid_cell_num[0], in_grid_cell_num[1])
+            vertex = self.graph.vertex_at_menu_pos(in_grid_cell_num)
             coord_number = find_coord(self.ar_grid_dimensions, in_grid_cell_num)
             number_of_cells = self.ar_grid_dimensions[0] * self.ar_grid_dimensions[1]
 
             if valid_cell(self.ar_grid_dimensions, in_grid_cell_num, coord_number,
-                          number_of_cells) and self.start_pos is None:
+                          number_of_cells) and self.start_pos is None and vertex is not None:
                 # change vertex state to 'start'
-                self.graph.vertices[pixel_pos].state = 'start'
-                self.start_pos = self.graph.vertices[pixel_pos].pos
+                vertex.state = 'start'
+                self.start_pos = vertex.pos
 
         elif self.program.mid_click[0]:
             pos = self.program.mid_click[1]
             in_grid_cell_num = ((pos[0] - 50) // (700 // self.ar_grid_dimensions[0]),
                                 ((pos[1] - 100) // (700 // self.ar_grid_dimensions[1])))
-            pixel_pos = get_air_file_pos(in_grid_cell_num[0], in_grid_cell_num[1])
+            vertex = self.graph.vertex_at_menu_pos(in_grid_cell_num)
             coord_number = find_coord(self.ar_grid_dimensions, in_grid_cell_num)
             number_of_cells = self.ar_grid_dimensions[0] * self.ar_grid_dimensions[1]
             # see how coord_number works
             if valid_cell(self.ar_grid_dimensions, in_grid_cell_num, coord_number,
-                          number_of_cells) and self.end_pos is None:
+                          number_of_cells) and self.end_pos is None and vertex is not None:
                 # change vertex state to 'end'
-                self.graph.vertices[pixel_pos].state = 'end'
-                self.end_pos = self.graph.vertices[pixel_pos].pos
+                vertex.state = 'end'
+                self.end_pos = vertex.pos
 
         # ENTER starts simulation for user
         elif self.program.enter_key:
@@ -1066,6 +1103,60 @@ class AirProgramMenu(Menu):
                 self.run_display = False
 
 
+class RouteResult:
+    """ The route computed between two vertices of a weighted graph by one of its search
+    engines. A route is only computed once per start, end, engine and graph version (i.e. until
+    a vertex is blocked or unblocked), after which the program runs simply draw it every frame.
+
+    Instance Attributes:
+        - graph: the weighted graph the route was computed in.
+        - start_pos: the position of the vertex the route starts at.
+        - end_pos: the position of the vertex the route ends at.
+        - engine: the search engine used to compute the route.
+        - version: the version of the graph the route was computed for.
+        - path: the positions of the vertices traversed from start_pos to end_pos, or None if
+        the two vertices are not connected.
+        - weight: the total weight of the edges of the route (distance or cost), or None if
+        the two vertices are not connected.
+
+    Representation Invariants:
+        - self.engine in WEIGHTED_SEARCH_ENGINES
+        - (self.path is None) == (self.weight is None)
+    """
+    graph: WeightedGraph
+    start_pos: tuple[float, float]
+    end_pos: tuple[float, float]
+    engine: str
+    version: int
+    path: Optional[list[tuple[float, float]]]
+    weight: Optional[float]
+
+    def __init__(self, graph: WeightedGraph, start_pos: tuple[float, float],
+                 end_pos: tuple[float, float], engine: str) -> None:
+        """ Compute the route from start_pos to end_pos in graph with the given engine.
+        """
+        self.graph = graph
+        self.start_pos = start_pos
+        self.end_pos = end_pos
+        self.engine = engine
+        self.version = graph.version
+
+        # the graph's component index tells us in constant time when there is no path at all
+        if graph.connected(start_pos, end_pos):
+            result = graph.shortest_path(start_pos, end_pos, engine)[end_pos]
+            self.weight, self.path = result[0], result[1]
+        else:
+            self.weight, self.path = None, None
+
+    def is_current(self, graph: WeightedGraph, start_pos: tuple[float, float],
+                   end_pos: tuple[float, float], engine: str) -> bool:
+        """ Return whether this route is still the one that would be computed for the given
+        graph, start, end and engine.
+        """
+        return self.graph is graph and self.version == graph.version and \
+            (self.start_pos, self.end_pos, self.engine) == (start_pos, end_pos, engine)
+
+
 class AirProgramRun(Menu):
     """ The class controlling the interactions and overall connection between the user
     and the air routes program's simulation of this program.
@@ -1097,8 +1188,12 @@ class AirProgramRun(Menu):
         user's self.start_pos to self.end_pos.
         - self.cities: str representing the cities to be traversed to go from the
         user's self.start_pos to self.end_pos.
+        - self.search_engine: str naming the search engine used to compute the path.
+        - self.route: the RouteResult last computed and drawn, or None if no route has been
+        computed yet.
 
     Representation Invariants:
+        - self.search_engine in WEIGHTED_SEARCH_ENGINES
         - 0 <= self.message_coords[0] <= 800 and 0 <= self.message_coords[1] <= 810
     """
     # All attributes imported from the Menu parent class are inherited by this class
@@ -1114,6 +1209,8 @@ class AirProgramRun(Menu):
     show_distance: bool
     distance: float
     cities: str
+    search_engine: str
+    route: Optional[RouteResult]
 
     def __init__(self, program: pygame.display, graph: WeightedGraph) -> None:
         """ Initialize a AirProgramRun object and its attributes along with the given
@@ -1135,12 +1232,15 @@ class AirProgramRun(Menu):
 
         self.distance = 0.00  # default to 0, no points chosen as start or finish
         self.cities = ''  # string represented traversed countries default to an empty str
+        # the map is small and rarely changes, so every route is looked up in an all-pairs table
+        self.search_engine = 'table'
+        self.route = None
 
     def display_menu(self) -> None:
         """ Function controlling the main loop in charge of displaying and updating
         the AirProgramRun screen being shown to the user.
         """
-        self.run_display = True
+        self.start_display()
         while self.run_display:
             self.program.catch_events_menu()  # detect events
             self.check_input()  # receive user input
@@ -1152,10 +1252,11 @@ class AirProgramRun(Menu):
             self.program.draw_title_text(20, "Air Routes Run", (90, 30), 'white')
 
             instructions = "Press Enter to run program and draw the path connecting start and end" \
-                           " (using DIJKSTRA'S)"
+                           " (using " + WEIGHTED_SEARCH_ENGINES[self.search_engine] + ")"
             self.program.draw_title_text(16, instructions, (self.mid_coords[0], 80))
 
-            self.program.display.blit(pygame.image.load('media/BG_world_map.png'), (0, 100))
+            self.program.display.blit(self.program.assets.image('media/BG_world_map.png', self),
+                                      (0, 100))
             self.program.draw_air_graph(self.graph)
 
             if self.show_path is True:
@@ -1201,7 +1302,7 @@ class AirProgramRun(Menu):
         """
         if self.program.back_key:
             # reset the graph the user just used
-            self.program.air_routes_program_menu.graph = world_cities_graph(8, 10)
+            self.program.air_routes_program_menu.graph.reset_states()
             self.program.air_routes_program_menu.start_pos = None
             self.program.air_routes_program_menu.end_pos = None
 
@@ -1214,37 +1315,39 @@ class AirProgramRun(Menu):
                 self.show_path = True
 
     def draw_path(self) -> None:
-        """ Method in charge of making the call to Dijkstra's algorithm which calculates
-        the path to be followed by the user, and displaying this path on the
-        AirProgramRun screen by mutating the user's graph.
+        """ Method in charge of making the call to the selected search algorithm (looking the
+        route up in the graph's all-pairs table by default) which calculates the path to be
+        followed by the user, and displaying this path on the AirProgramRun screen by mutating
+        the user's graph.
+
+        The route is only computed again when the start, end, engine or blocked vertices
+        change; every other frame just draws the stored route.
         """
-        if self.graph.connected(self.start_pos, self.end_pos):
-            path_to_follow = self.graph.dijkstra_search(self.start_pos, self.end_pos)
-            for i in range(0, len(path_to_follow[self.end_pos][1]) - 1):
-                # highlight edges
-                local_start = path_to_follow[self.end_pos][1][i]
-                local_end = path_to_follow[self.end_pos][1][i + 1]
-                pygame.draw.line(self.program.display, 'cyan', local_start, local_end, 2)
-
-            for vertex_pos in path_to_follow[self.end_pos][1][1:-1]:
-                # highlight vertices in path (not the ends)
-                self.graph.vertices[vertex_pos].state = 'path'
-
-            self.show_distance = True
-            self.distance = round(path_to_follow[self.end_pos][0], 2)
-            self.show_message2 = True
-            self.cities = self.cities_traversed(path_to_follow, self.end_pos)
-        else:  # the two selected vertices are not connected (distance between them is inf)
-            self.show_message1 = True
-
-    def cities_traversed(self, path: dict[tuple[float, float], list],
-                         destination_coord: tuple[int, int]) -> str:
+        if self.route is None or not self.route.is_current(self.graph, self.start_pos,
+                                                           self.end_pos, self.search_engine):
+            self.route = RouteResult(self.graph, self.start_pos, self.end_pos, self.search_engine)
+
+            if self.route.path is not None:
+                for vertex_pos in self.route.path[1:-1]:
+                    # highlight vertices in path (not the ends)
+                    self.graph.vertices[vertex_pos].state = 'path'
+
+                self.show_distance = True
+                self.distance = round(self.route.weight, 2)
+                self.show_message2 = True
+                self.cities = self.cities_traversed(self.route.path)
+            else:  # the two selected vertices are not connected (distance between them is inf)
+                self.show_message1 = True
+
+        if self.route.path is not None and len(self.route.path) > 1:
+            # highlight edges
+            pygame.draw.lines(self.program.display, 'cyan', False, self.route.path, 2)
+
+    def cities_traversed(self, traversed_coords_lst: list[tuple[float, float]]) -> str:
         """ Method in charge of returning a string containing of all the countries
         traversed throughout the path calculated and displayed to the user, based on
-        the pixel positions resulting from the Dijkstra's algorithm function.
+        the pixel positions of the path resulting from the search algorithm.
         """
-        traversed_coords_lst = path[destination_coord][1]
-
         countries_so_far = ''
         for i in range(0, len(traversed_coords_lst)):
             if i < len(traversed_coords_lst) - 1:
@@ -1291,7 +1394,7 @@ class AirCostProgramMenu(Menu):
         """
         Menu.__init__(self, program)
         # the default weighted graph we start this program with
-        self.graph = world_countries_graph(ARC_DIM[0], AR_DIM[1])
+        self.graph = world_countries_graph(ARC_DIM[0], ARC_DIM[1])
         self.arc_grid_dimensions = ARC_DIM
 
         self.start_pos = None
@@ -1301,7 +1404,7 @@ class AirCostProgramMenu(Menu):
         """ Function controlling the main loop in charge of displaying and updating
         the AirCostProgramMenu screen being shown to the user.
         """
-        self.run_display = True
+        self.start_display()
         while self.run_display:
             self.program.catch_events_menu()  # detect events
             self.check_input()  # receive user input
@@ -1331,7 +1434,7 @@ class AirCostProgramMenu(Menu):
         """
         if self.program.back_key:
             # reset graph
-            self.graph = world_countries_graph(ARC_DIM[0], ARC_DIM[1])
+            self.graph.reset_states()
             self.start_pos = None
             self.end_pos = None
 
@@ -1344,42 +1447,42 @@ class AirCostProgramMenu(Menu):
             pos = self.program.left_click[1]
             in_grid_cell_num = ((pos[0] - 50) // (700 // self.arc_grid_dimensions[0]),
                                 ((pos[1] - 100) // (700 // self.arc_grid_dimensions[1])))
-            pixel_pos = get_air_cost_file_pos(in_grid_cell_num[0], in_grid_cell_num[1])
+            vertex = self.graph.vertex_at_menu_pos(in_grid_cell_num)
             coord_number = find_coord(self.arc_grid_dimensions, in_grid_cell_num)
             number_of_cells = self.arc_grid_dimensions[0] * self.arc_grid_dimensions[1]
 
             if valid_cell(self.arc_grid_dimensions, in_grid_cell_num, coord_number,
-                          number_of_cells):
+                          number_of_cells) and vertex is not None:
                 # change vertex state to 'blocked'
-                self.graph.vertices[pixel_pos].state = 'blocked'
+                vertex.state = 'blocked'
 
         elif self.program.right_click[0]:
             pos = self.program.right_click[1]
             in_grid_cell_num = ((pos[0] - 50) // (700 // self.arc_grid_dimensions[0]),
                                 ((pos[1] - 100) // (700 // self.arc_grid_dimensions[1])))
-            pixel_pos = get_air_cost_file_pos(in_grid_cell_num[0], in_grid_cell_num[1])
+            vertex = self.graph.vertex_at_menu_pos(in_grid_cell_num)
             coord_number = find_coord(self.arc_grid_dimensions, in_grid_cell_num)
             number_of_cells = self.arc_grid_dimensions[0] * self.arc_grid_dimensions[1]
 
             if valid_cell(self.arc_grid_dimensions, in_grid_cell_num, coord_number,
-                          number_of_cells) and self.start_pos is None:
+                          number_of_cells) and self.start_pos is None and vertex is not None:
                 # change vertex state to 'start'
-                self.graph.vertices[pixel_pos].state = 'start'
-                self.start_pos = self.graph.vertices[pixel_pos].pos
+                vertex.state = 'start'
+                self.start_pos = vertex.pos
 
         elif self.program.mid_click[0]:
             pos = self.program.mid_click[1]
             in_grid_cell_num = ((pos[0] - 50) // (700 // self.arc_grid_dimensions[0]),
                                 ((pos[1] - 100) // (700 // self.arc_grid_dimensions[1])))
-            pixel_pos = get_air_cost_file_pos(in_grid_cell_num[0], in_grid_cell_num[1])
+            vertex = self.graph.vertex_at_menu_pos(in_grid_cell_num)
             coord_number = find_coord(self.arc_grid_dimensions, in_grid_cell_num)
             number_of_cells = self.arc_grid_dimensions[0] * self.arc_grid_dimensions[1]
             # see how coord_number works
             if valid_cell(self.arc_grid_dimensions, in_grid_cell_num, coord_number,
-                          number_of_cells) and self.end_pos is None:
+                          number_of_cells) and self.end_pos is None and vertex is not None:
                 # change vertex state to 'end'
-                self.graph.vertices[pixel_pos].state = 'end'
-                self.end_pos = self.graph.vertices[pixel_pos].pos
+                vertex.state = 'end'
+                self.end_pos = vertex.pos
 
         # ENTER starts simulation for user
         elif self.program.enter_key:
@@ -1424,8 +1527,12 @@ class AirCostProgramRun(Menu):
         user's self.start_pos to self.end_pos.
         - self.countries: str representing the cities to be traversed to go from the
         user's self.start_pos to self.end_pos.
+        - self.search_engine: str naming the search engine used to compute the path.
+        - self.route: the RouteResult last computed and drawn, or None if no route has been
+        computed yet.
 
     Representation Invariants:
+        - self.search_engine in WEIGHTED_SEARCH_ENGINES
         - 0 <= self.message_coords[0] <= 800 and 0 <= self.message_coords[1] <= 810
         - self.cost >= 0
     """
@@ -1442,6 +1549,8 @@ class AirCostProgramRun(Menu):
     show_cost: bool
     cost: float
     countries: str
+    search_engine: str
+    route: Optional[RouteResult]
 
     def __init__(self, program: pygame.display, graph: WeightedGraph) -> None:
         """ Initialize a AirCostProgramRun object and its attributes along with the given
@@ -1463,12 +1572,15 @@ class AirCostProgramRun(Menu):
 
         self.cost = 0.00  # default to 0, no points chosen as start or finish
         self.countries = ''  # string represented traversed countries default to an empty str
+        # the map is small and rarely changes, so every route is looked up in an all-pairs table
+        self.search_engine = 'table'
+        self.route = None
 
     def display_menu(self) -> None:
         """ Function controlling the main loop in charge of displaying and updating
         the AirCostProgramRun screen being shown to the user.
         """
-        self.run_display = True
+        self.start_display()
         while self.run_display:
             self.program.catch_events_menu()  # detect events
             self.check_input()  # receive user input
@@ -1480,10 +1592,11 @@ class AirCostProgramRun(Menu):
             self.program.draw_title_text(20, "Air Cost Run", (100, 30), 'white')
 
             instructions = "Press Enter to run program and draw the path connecting start and end" \
-                           " (using DIJKSTRA'S)"
+                           " (using " + WEIGHTED_SEARCH_ENGINES[self.search_engine] + ")"
             self.program.draw_title_text(16, instructions, (self.mid_coords[0], 80))
 
-            self.program.display.blit(pygame.image.load('media/BG_world_map.png'), (0, 100))
+            self.program.display.blit(self.program.assets.image('media/BG_world_map.png', self),
+                                      (0, 100))
             self.program.draw_air_graph(self.graph)
 
             if self.show_path is True:
@@ -1529,7 +1642,7 @@ class AirCostProgramRun(Menu):
         """
         if self.program.back_key:
             # reset the graph the user just used
-            self.program.air_cost_program_menu.graph = world_countries_graph(ARC_DIM[0], ARC_DIM[1])
+            self.program.air_cost_program_menu.graph.reset_states()
             self.program.air_cost_program_menu.start_pos = None
             self.program.air_cost_program_menu.end_pos = None
 
@@ -1542,37 +1655,39 @@ class AirCostProgramRun(Menu):
                 self.show_path = True
 
     def draw_path(self) -> None:
-        """ Method in charge of making the call to Dijkstra's algorithm which calculates
-        the path to be followed by the user, and displaying this path on the
-        AirCostProgramRun screen by mutating the user's graph.
+        """ Method in charge of making the call to the selected search algorithm (looking the
+        route up in the graph's all-pairs table by default) which calculates the path to be
+        followed by the user, and displaying this path on the AirCostProgramRun screen by
+        mutating the user's graph.
+
+        The route is only computed again when the start, end, engine or blocked vertices
+        change; every other frame just draws the stored route.
         """
-        if self.graph.connected(self.start_pos, self.end_pos):
-            path_to_follow = self.graph.dijkstra_search(self.start_pos, self.end_pos)
-            for i in range(0, len(path_to_follow[self.end_pos][1]) - 1):
-                # highlight edges
-                local_start = path_to_follow[self.end_pos][1][i]
-                local_end = path_to_follow[self.end_pos][1][i + 1]
-                pygame.draw.line(self.program.display, 'cyan', local_start, local_end, 2)
-
-            for vertex_pos in path_to_follow[self.end_pos][1][1:-1]:
-                # highlight vertices in path (not the ends)
-                self.graph.vertices[vertex_pos].state = 'path'
-
-            self.show_cost = True
-            self.cost = round(path_to_follow[self.end_pos][0], 2)
-            self.show_message2 = True
-            self.countries = self.countries_traversed(path_to_follow, self.end_pos)
-        else:  # the two selected vertices are not connected (distance between them is inf)
-            self.show_message1 = True
-
-    def countries_traversed(self, path: dict[tuple[float, float], list],
-                            destination_coord: tuple[int, int]) -> str:
+        if self.route is None or not self.route.is_current(self.graph, self.start_pos,
+                                                           self.end_pos, self.search_engine):
+            self.route = RouteResult(self.graph, self.start_pos, self.end_pos, self.search_engine)
+
+            if self.route.path is not None:
+                for vertex_pos in self.route.path[1:-1]:
+                    # highlight vertices in path (not the ends)
+                    self.graph.vertices[vertex_pos].state = 'path'
+
+                self.show_cost = True
+                self.cost = round(self.route.weight, 2)
+                self.show_message2 = True
+                self.countries = self.countries_traversed(self.route.path)
+            else:  # the two selected vertices are not connected (distance between them is inf)
+                self.show_message1 = True
+
+        if self.route.path is not None and len(self.route.path) > 1:
+            # highlight edges
+            pygame.draw.lines(self.program.display, 'cyan', False, self.route.path, 2)
+
+    def countries_traversed(self, traversed_coords_lst: list[tuple[float, float]]) -> str:
         """ Method in charge of returning a string containing of all the countries
         traversed throughout the path calculated and displayed to the user, based on
-        the pixel positions resulting from the Dijkstra's algorithm function.
+        the pixel positions of the path resulting from the search algorithm.
         """
-        traversed_coords_lst = path[destination_coord][1]
-
         countries_so_far = ''
         for i in range(0, len(traversed_coords_lst)):
             if i < len(traversed_coords_lst) - 1:
@@ -1609,6 +1724,23 @@ def get_maze_details(maze: Optional[str]) -> tuple[str, tuple[int, int]]:
         return MAZE1
 
 
+def cycle_engine(engine: str, forward: bool) -> str:
+    """ Helper for the grid program runs returning the search engine that comes after (or
+    before, if not forward) the given one in GRID_SEARCH_ENGINES, wrapping around at both ends.
+
+    Preconditions:
+        - engine in GRID_SEARCH_ENGINES
+
+    >>> cycle_engine('bfs', True) == list(GRID_SEARCH_ENGINES)[1]
+    True
+    >>> cycle_engine(cycle_engine('bfs', True), False)
+    'bfs'
+    """
+    engines = list(GRID_SEARCH_ENGINES)
+    step = 1 if forward else -1
+    return engines[(engines.index(engine) + step) % len(engines)]
+
+
 def find_coord(dimensions: tuple[int, int], cell: tuple[int, int]) -> int:
     """ Helper to mouse position detection methods returning the position number
      of a vertex (cell) in a graph based on the cell pressed on the pygame window.
@@ -1639,66 +1771,6 @@ def valid_cell(dimensions: tuple[int, int], cell_number: tuple[int, int], coord_
         return False
 
 
-def get_air_file_pos(grid_column: int, grid_row: int) -> tuple[float, float]:
-    """ Helper fetching the pixel pos (tuple of two floats) of a vertex from
-    the 'datasets/cities.csv' file based on the row number on the csv file which is
-    determined using the menu_pos attribute of the vertex of interest.
-
-    Preconditions:
-        - 0 <= grid_column <= 7
-        - 0 <= grid_row <= 9
-
-    # position of Panama on the pygame window
-    >>> get_air_file_pos(5, 1)
-    (203.0, 391.0)
-    >>> get_air_file_pos(5, 6)
-    (538.0, 344.0)
-    """
-    row_num = (grid_row * 8) + grid_column + 1
-
-    with open('datasets/cities.csv') as csv_file:
-        reader = csv.reader(csv_file)
-
-        i = 1
-        for row in reader:
-            if i == row_num:
-                return (float(row[1]), float(row[2]))
-            else:
-                i += 1
-
-    raise ValueError  # as long as preconditions are followed, this error is not raised
-
-
-def get_air_cost_file_pos(grid_column: int, grid_row: int) -> tuple[float, float]:
-    """ Helper fetching the pixel pos (tuple of two floats) of a vertex from
-    the 'datasets/cities.csv' file based on the row number on the csv file which is
-    determined using the menu_pos attribute of the vertex of interest.
-
-    Preconditions:
-        - 0 <= grid_column <= 3
-        - 0 <= grid_row <= 4
-
-    # position of Panama on the pygame window
-    >>> get_air_cost_file_pos(1, 4)
-    (511.0, 348.0)
-    >>> get_air_cost_file_pos(2, 3)
-    (648.0, 498.0)
-    """
-    row_num = (grid_row * 4) + grid_column + 1
-
-    with open('datasets/countries.csv') as csv_file:
-        reader = csv.reader(csv_file)
-
-        i = 1
-        for row in reader:
-            if i == row_num:
-                return (float(row[1]), float(row[2]))
-            else:
-                i += 1
-
-    raise ValueError  # as long as preconditions are followed, this error is not raised
-
-
 # Some errors raised were counter-intuitive which is why we have removed them
 if __name__ == '__main__':
     import python_ta
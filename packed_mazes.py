@@ -0,0 +1,316 @@
+"""CSC111 Winter 2021 Course Project: Bit-Packed Mazes
+
+Authors: Michele Massa, Nischal Nair, Nathan Zavys-Cox
+
+Description: this module contains the bit-packed maze file format, meant for mazes far too
+large to be loaded as a whole. A packed maze file holds a small header (dimensions and the
+start and end cells) followed by one bit per cell telling whether the cell is blocked, row by
+row. Packed mazes are memory mapped rather than read, searched directly on their bits, and
+shown in the menus one tile (a GridGraph of part of the maze) at a time. This module also
+contains the function converting our csv maze files to packed maze files.
+
+This file is copyright (c) 2021 Michele Massa, Nischal Nair and Nathan Zavys-Cox.
+"""
+from typing import Any, Optional
+import struct
+
+import numpy as np
+
+from grid_classes import GridGraph, csv_row_codes, BLOCKED, SMALL_FRONTIER, STATE_CODES
+
+
+#############
+# CONSTANTS #
+#############
+
+# the file name extension of packed maze files
+MAZE_SUFFIX = '.maze'
+
+# the first bytes of every packed maze file, and the version of the format it is written in
+MAZE_MAGIC = b'CSC111MZ'
+MAZE_VERSION = 1
+
+# the header of a packed maze: magic, format version, width, height, start (x, y) and
+# end (x, y), where the start and end are (-1, -1) when the maze has none
+MAZE_HEADER = struct.Struct('<8sIQQqqqq')
+
+
+###########
+# Classes #
+###########
+
+
+class PackedMaze:
+    """ A maze stored in a packed maze file, mapped into memory. Each row of the maze takes
+    row_bytes bytes of the file, the cell at (x, y) being blocked if bit 7 - (x % 8) of byte
+    x // 8 of row y is set (the last byte of a row is padded with zeros).
+
+    Instance Attributes:
+        - width: the number of columns of the maze
+        - height: the number of rows of the maze
+        - start: the position of the start cell, or None if the maze has none
+        - end: the position of the end cell, or None if the maze has none
+        - row_bytes: the number of bytes every row takes up
+        - bits: the packed rows of the maze, a read-only view of the file
+
+    Representation Invariants:
+        - self.width > 0 and self.height > 0
+        - self.row_bytes == (self.width + 7) // 8
+        - len(self.bits) == self.row_bytes * self.height
+    """
+    width: int
+    height: int
+    start: Optional[tuple[int, int]]
+    end: Optional[tuple[int, int]]
+    row_bytes: int
+    bits: np.ndarray
+
+    def __init__(self, file_name: str) -> None:
+        """ Map the packed maze file file_name into memory.
+
+        Raise a ValueError if the file is not a packed maze file of the current version.
+        """
+        with open(file_name, 'rb') as maze_file:
+            header = maze_file.read(MAZE_HEADER.size)
+        if len(header) < MAZE_HEADER.size:
+            raise ValueError
+        magic, version, width, height, start_x, start_y, end_x, end_y = \
+            MAZE_HEADER.unpack(header)
+        if magic != MAZE_MAGIC or version != MAZE_VERSION:
+            raise ValueError
+
+        self.width, self.height = width, height
+        self.start = None if start_x == -1 else (start_x, start_y)
+        self.end = None if end_x == -1 else (end_x, end_y)
+        self.row_bytes = (width + 7) // 8
+        self.bits = np.memmap(file_name, dtype=np.uint8, mode='r', offset=MAZE_HEADER.size,
+                              shape=(self.row_bytes * height,))
+
+    def is_blocked(self, pos: tuple[int, int]) -> bool:
+        """ Return whether the cell at pos is blocked.
+
+        Preconditions:
+            - 0 <= pos[0] < self.width and 0 <= pos[1] < self.height
+        """
+        byte = self.bits[pos[1] * self.row_bytes + (pos[0] >> 3)]
+        return bool((byte >> (7 - (pos[0] & 7))) & 1)
+
+    def tile(self, left: int, top: int, width: int, height: int) -> GridGraph:
+        """ Return a grid graph of the width by height part of the maze whose top left cell is
+        at (left, top), with its blocked, start and end cells. Only the rows of the tile are
+        unpacked. The tile is cut short where it would go past the edge of the maze.
+
+        Preconditions:
+            - 0 <= left < self.width and 0 <= top < self.height
+            - width > 0 and height > 0
+        """
+        width, height = min(width, self.width - left), min(height, self.height - top)
+        rows = self.bits.reshape(self.height, self.row_bytes)[top:top + height,
+                                                              left >> 3:(left + width + 7) >> 3]
+        blocked = np.unpackbits(rows, axis=1)[:, left & 7:(left & 7) + width]
+
+        tile = GridGraph(width, height, bytearray((blocked * BLOCKED).tobytes()))
+        for pos, state in ((self.start, 'start'), (self.end, 'end')):
+            if pos is not None and 0 <= pos[0] - left < width and 0 <= pos[1] - top < height:
+                tile.cells[tile.index((pos[0] - left, pos[1] - top))] = STATE_CODES[state]
+        return tile
+
+    def breadth_first_search(self, start_pos: tuple[int, int],
+                             end_pos: tuple[int, int]) -> Optional[list]:
+        """ Returns the shortest path between two cells in the same format as
+        GridGraph.breadth_first_search (the cells strictly between them, or None if there is
+        no path), reading the blocked bits straight from the file.
+
+        The search expands one whole level (wavefront) at a time, like
+        GridGraph.wavefront_distances: frontiers smaller than SMALL_FRONTIER are expanded in
+        plain Python, reading single bits, and larger ones with numpy index arithmetic.
+        Instead of a distance per cell, the search only records the distance of each reached
+        cell modulo 3, in 2 bits per cell (0 for cells not reached yet): as adjacent cells are
+        at most one step apart, the neighbour one step closer to start_pos is still the only
+        one whose distance is one less modulo 3. The search therefore takes a quarter of a
+        byte per cell on top of the maze itself.
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'MAP1' + MAZE_SUFFIX)
+        >>> convert_csv_maze('datasets/MAP1_csv.csv', path)
+        >>> PackedMaze(path).breadth_first_search((1, 0), (4, 8))
+        [(1, 1), (2, 1), (3, 1), (4, 1), (4, 2), (4, 3), (4, 4), (4, 5), (4, 6), (4, 7)]
+        >>> PackedMaze(path).breadth_first_search((1, 0), (0, 0)) is None
+        True
+        """
+        width = self.width
+        start, end = start_pos[1] * width + start_pos[0], end_pos[1] * width + end_pos[0]
+        if start == end:
+            return []
+
+        levels = bytearray((width * self.height + 3) // 4)
+        levels[start >> 2] = 1 << ((start & 3) * 2)
+        frontier, step = [start], 0
+        while len(frontier) > 0 and _level(levels, end) == 0:
+            if len(frontier) < SMALL_FRONTIER:
+                frontier = frontier if isinstance(frontier, list) else frontier.tolist()
+                step, frontier = self._expand_small_levels(frontier, step, end, levels)
+            else:
+                step += 1
+                frontier = self._expand_wide_level(np.asarray(frontier), step, levels)
+
+        if _level(levels, end) == 0:
+            return None
+        return self._rebuild_interior(levels, end, step)
+
+    def _expand_small_levels(self, frontier: list[int], step: int, end: int,
+                             levels: bytearray) -> tuple[int, Any]:
+        """ Expand frontier one level at a time in plain Python, reading the blocked bits one
+        by one and recording levels, for as long as it stays smaller than SMALL_FRONTIER and
+        the end cell is not reached, like grid_classes._expand_small_frontiers.
+        Return the last step done and the frontier left, as a numpy array if it grew large.
+        """
+        width, size, row_bytes = self.width, self.width * self.height, self.row_bytes
+        bits = memoryview(self.bits)
+        while 0 < len(frontier) < SMALL_FRONTIER and _level(levels, end) == 0:
+            step += 1
+            code = step % 3 + 1
+            next_frontier = []
+            for i in frontier:
+                x = i % width
+                # the adjacent cells are worked out inline, as this loop runs once per cell
+                for j in (i - width if i >= width else -1, i + width if i + width < size else -1,
+                          i - 1 if x > 0 else -1, i + 1 if x < width - 1 else -1):
+                    if j != -1 and (levels[j >> 2] >> ((j & 3) * 2)) & 3 == 0:
+                        y, x_j = divmod(j, width)
+                        if not (bits[y * row_bytes + (x_j >> 3)] >> (7 - (x_j & 7))) & 1:
+                            levels[j >> 2] |= code << ((j & 3) * 2)
+                            next_frontier.append(j)
+            frontier = next_frontier
+
+        if len(frontier) >= SMALL_FRONTIER:
+            return step, np.array(frontier, dtype=np.int64)
+        return step, frontier
+
+    def _expand_wide_level(self, frontier: np.ndarray, step: int,
+                           levels: bytearray) -> np.ndarray:
+        """ Expand frontier by one level with numpy index arithmetic, recording the level of
+        the newly reached cells (step modulo 3, plus 1) in levels. Return the new frontier.
+        """
+        width, size = self.width, self.width * self.height
+        levels_view = np.frombuffer(levels, dtype=np.uint8)
+
+        columns = frontier % width
+        shifted = np.concatenate((frontier[frontier >= width] - width,
+                                  frontier[frontier < size - width] + width,
+                                  frontier[columns > 0] - 1,
+                                  frontier[columns < width - 1] + 1))
+        shifted = shifted[~self._blocked_cells(shifted)]
+        shifted = shifted[(levels_view[shifted >> 2] >> ((shifted & 3) * 2)) & 3 == 0]
+        frontier = np.unique(shifted)
+        np.bitwise_or.at(levels_view, frontier >> 2,
+                         ((step % 3 + 1) << ((frontier & 3) * 2)).astype(np.uint8))
+        return frontier
+
+    def _rebuild_interior(self, levels: bytearray, end: int, step: int) -> list[tuple[int, int]]:
+        """ Return the positions of the cells strictly between the start and the cell at index
+        end, reached at the given step, by walking back from end and each time moving to the
+        neighbour whose level is one step closer to the start.
+        """
+        width, size = self.width, self.width * self.height
+        path = []
+        i = end
+        for distance in range(step - 1, 0, -1):
+            wanted = distance % 3 + 1
+            x = i % width
+            i = next(j for j in (i - width, i + width, i - 1 if x > 0 else -1,
+                                 i + 1 if x < width - 1 else -1)
+                     if 0 <= j < size and _level(levels, j) == wanted)
+            path.append((i % width, i // width))
+
+        path.reverse()
+        return path
+
+    def _blocked_cells(self, indices: np.ndarray) -> np.ndarray:
+        """ Return a boolean array telling whether each of the cells at the given indices
+        (y * self.width + x) is blocked.
+        """
+        rows, columns = np.divmod(indices, self.width)
+        byte = self.bits[rows * self.row_bytes + (columns >> 3)]
+        return ((byte >> (7 - (columns & 7))) & 1).astype(bool)
+
+
+####################
+# Helper Functions #
+####################
+
+
+def _level(levels: bytearray, i: int) -> int:
+    """ Return the 2-bit level code recorded in levels for the cell at index i.
+    """
+    return (levels[i >> 2] >> ((i & 3) * 2)) & 3
+
+
+######################
+# Conversion Helpers #
+######################
+
+
+def convert_csv_maze(csv_file: str, maze_file: str) -> None:
+    """ Write the maze of the csv maze file csv_file (see load_csv_into_grid) to maze_file as
+    a packed maze. The csv file is read one line at a time, so only one row of the maze is
+    ever held in memory. The first start and end cells found are kept as the start and end
+    of the maze.
+
+    Preconditions:
+        - every row of csv_file has the same number of cells
+    """
+    width, height = 0, 0
+    start, end = (-1, -1), (-1, -1)
+
+    with open(csv_file, 'rb') as source, open(maze_file, 'wb') as target:
+        target.write(bytes(MAZE_HEADER.size))  # rewritten once the dimensions are known
+        for line in source:
+            row = csv_row_codes(line)
+            if row is None:
+                continue
+
+            width = len(row)
+            if start == (-1, -1) and STATE_CODES['start'] in row:
+                start = (row.index(STATE_CODES['start']), height)
+            if end == (-1, -1) and STATE_CODES['end'] in row:
+                end = (row.index(STATE_CODES['end']), height)
+
+            target.write(np.packbits(np.frombuffer(row, dtype=np.uint8) == BLOCKED).tobytes())
+            height += 1
+
+        target.seek(0)
+        target.write(MAZE_HEADER.pack(MAZE_MAGIC, MAZE_VERSION, width, height, *start, *end))
+
+
+def load_maze_tile(file_name: str, left: int, top: int, width: int, height: int) -> GridGraph:
+    """ Return a grid graph of the width by height tile of the packed maze file_name whose
+    top left cell is at (left, top), for the maze menus to show.
+
+    >>> import os, tempfile
+    >>> from grid_classes import load_csv_into_grid
+    >>> path = os.path.join(tempfile.mkdtemp(), 'MAP3' + MAZE_SUFFIX)
+    >>> convert_csv_maze('datasets/MAP3_csv.csv', path)
+    >>> load_maze_tile(path, 0, 0, 13, 9).cells == load_csv_into_grid('datasets/MAP3_csv.csv').cells
+    True
+    >>> tile = load_maze_tile(path, 3, 2, 20, 4)
+    >>> (tile.width, tile.height)
+    (10, 4)
+    """
+    return PackedMaze(file_name).tile(left, top, width, height)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136', 'E9999', 'E9998', 'R0913'],
+        'extra-imports': [],
+        'max-nested-blocks': 5
+    })
+
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
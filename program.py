@@ -15,13 +15,15 @@ This file is copyright (c) 2021 Michele Massa, Nischal Nair and Nathan Zavys-Cox
 # IMPORTS #
 ###########
 from typing import Optional
+from collections import OrderedDict
+import time
 
 import pygame
 from pygame.colordict import THECOLORS
 import menu
+from assets import AssetManager
 from algorithm_classes import Graph
-from algorithm_classes_v2 import WeightedGraph, world_cities_graph
-from api import world_countries_graph
+from algorithm_classes_v2 import WeightedGraph
 
 #############
 # CONSTANTS #
@@ -33,9 +35,24 @@ WINDOW_SIZE = (800, 810)  # window size is strict
 MAX_GRID = (20, 20)
 GFS = 8
 
-# Air route data:
-AR_DIM = (8, 10)
-ARC_DIM = (4, 5)
+# Frame pacing:
+FPS_CAP = 60  # most frames drawn per second, even while animating
+# events that never change what is drawn, so they do not wake up an idle menu
+PASSIVE_EVENTS = {pygame.MOUSEMOTION, pygame.ACTIVEEVENT, pygame.WINDOWENTER,
+                  pygame.WINDOWLEAVE}
+
+# colour standing for transparency in the air graph edge layer (never used to draw edges)
+AIR_LAYER_KEY = (255, 0, 255)
+
+# Startup:
+STARTUP_BUDGET = 1.0  # seconds the program may take to draw its first frame
+# the menus of the program, which are only created the first time they are used
+MENU_NAMES = ('main_menu', 'simple_program_menu', 'simple_program_run', 'maze_program_menu',
+              'maze_program_run', 'air_routes_program_menu', 'air_routes_program_run',
+              'air_cost_program_menu', 'air_cost_program_run')
+
+# Text rendering:
+TEXT_CACHE_BUDGET = 4 * 2 ** 20  # most bytes of rendered text surfaces kept for reuse
 
 
 #################
@@ -84,9 +101,45 @@ class Program:
         its pixel position.
         - self.mid_click: keeps track of the interactions with the Middle Click and
         its pixel position.
+        - self.clock: pygame.time.Clock pacing the frames drawn by every menu loop.
+        - self.fps_cap: the most frames drawn per second.
+        - self.dirty: bool keeping track of whether something changed since the last frame
+        was drawn (user input, a menu being entered or a finished computation), so that a
+        new frame must be drawn.
+        - self.animating: bool keeping track of whether the current menu animates, in which
+        case frames are drawn continuously (at most fps_cap per second) instead of only
+        when self.dirty.
+        - self.grid_layer: off-screen pygame.Surface holding the last grid drawn by draw_grid,
+        or None if no grid has been drawn yet.
+        - self.grid_layer_graph: the graph drawn in self.grid_layer.
+        - self.grid_layer_key: the (grid dimensions, show_text) self.grid_layer was drawn with.
+        - self.air_layer: off-screen pygame.Surface holding the edges between the vertices
+        that are not blocked of the last graph drawn by draw_air_graph, or None if no air
+        graph has been drawn yet.
+        - self.air_layer_graph: the graph drawn in self.air_layer.
+        - self.air_layer_version: the version of the graph drawn in self.air_layer.
+        - self.air_layer_origin: the display position of the top left corner of self.air_layer.
+        - self.air_blocked_edges: the (position, position) ends of the edges of the graph in
+        self.air_layer that have a blocked end, which are drawn over the layer.
+        - self.fonts: dictionary mapping (font name, size) pairs to their loaded font, so that
+        every font is only looked up once.
+        - self.text_cache: maps the (font name, text, size, colour) of the text rendered by
+        render_text to its surface and size in bytes, from the least to the most recently
+        used.
+        - self.text_cache_size: the total size in bytes of the surfaces in self.text_cache.
+        - self.text_cache_budget: the most bytes self.text_cache may take up.
+        - self.assets: the AssetManager loading and sharing the images shown by the menus.
+        - self.start_time: the time.perf_counter() time at which the program was started.
+        - self.startup_times: dictionary mapping every startup phase (including the creation
+        of each menu) to the number of seconds it took, in the order they happened.
+        - self.first_frame_time: the number of seconds it took to draw the first frame, or None
+        if it has not been drawn yet.
+
+    The menus are created the first time they are used (see create_menu), and then kept.
 
     Representation Invariants:
         - self.display dimensions == (800, 810)
+        - self.fps_cap > 0
     """
 
     running: bool
@@ -97,7 +150,7 @@ class Program:
     font_name: str
 
     # menus
-    main_menu = menu.MainMenu
+    main_menu: menu.MainMenu
     simple_program_menu: menu.SpMenu
     simple_program_run: menu.SimpleProgramRun
     maze_program_menu: menu.MazeProgramMenu
@@ -107,7 +160,7 @@ class Program:
     air_cost_program_menu: menu.AirCostProgramMenu
     air_cost_program_run: menu.AirCostProgramRun
 
-    curr_menu = menu.MainMenu
+    curr_menu: menu.Menu
 
     # keys and clicks
     up_key: bool
@@ -120,10 +173,38 @@ class Program:
     right_click: tuple[bool, Optional[tuple[int, int]]]
     mid_click: tuple[bool, Optional[tuple[int, int]]]
 
+    # frame pacing
+    clock: pygame.time.Clock
+    fps_cap: int
+    dirty: bool
+    animating: bool
+
+    # cached drawings
+    grid_layer: Optional[pygame.Surface]
+    grid_layer_graph: Optional[Graph]
+    grid_layer_key: Optional[tuple[tuple[int, int], bool]]
+    air_layer: Optional[pygame.Surface]
+    air_layer_graph: Optional[WeightedGraph]
+    air_layer_version: int
+    air_layer_origin: tuple[int, int]
+    air_blocked_edges: list[tuple[tuple[float, float], tuple[float, float]]]
+    fonts: dict[tuple[str, int], pygame.font.Font]
+    text_cache: OrderedDict[tuple[str, str, int, str], tuple[pygame.Surface, int]]
+    text_cache_size: int
+    text_cache_budget: int
+    assets: AssetManager
+    start_time: float
+    startup_times: dict[str, float]
+    first_frame_time: Optional[float]
+
     def __init__(self) -> None:
         """ Initialize the pygame window and control the state of all of its contents
         according to user input.
         """
+        self.start_time = time.perf_counter()
+        self.startup_times = {}
+        self.first_frame_time = None
+
         pygame.init()
         pygame.display.set_caption("Efficient Space Traversal")
         pygame.display.set_icon(pygame.image.load('media/EST_Logo.png'))
@@ -135,6 +216,7 @@ class Program:
 
         self.window = pygame.display.set_mode(WINDOW_SIZE)
         self.display = pygame.Surface(WINDOW_SIZE)
+        self.startup_times['pygame window'] = time.perf_counter() - self.start_time
 
         self.font_name = 'comicsansms'
 
@@ -145,26 +227,53 @@ class Program:
         self.left_click, self.right_click, self.mid_click = \
             (False, None), (False, None), (False, None)
 
-        # different windows
-
-        self.main_menu = menu.MainMenu(self)
-        self.simple_program_menu = menu.SpMenu(self)
-        # this is the default load which is overwritten when user enters the simple program run menu
-        self.simple_program_run = menu.SimpleProgramRun(self, (5, 5))
-        self.maze_program_menu = menu.MazeProgramMenu(self)
-        # this is the default load which is overwritten when user enters the maze program run menu
-        self.maze_program_run = menu.MazeProgramRun(self, 'datasets/default_maze.csv', (5, 5))
-        self.air_routes_program_menu = menu.AirProgramMenu(self)
-        # this is the default load which is overwritten when user enters the air program run menu
-        self.air_routes_program_run = menu.AirProgramRun(self, world_cities_graph(AR_DIM[0],
-                                                                                  AR_DIM[1]))
-        self.air_cost_program_menu = menu.AirCostProgramMenu(self)
-        # this is the default load which is overwritten when user enters the air program run menu
-        self.air_cost_program_run = menu.AirCostProgramRun(self, world_countries_graph(ARC_DIM[0],
-                                                                                       ARC_DIM[1]))
+        # frame pacing
+
+        self.clock = pygame.time.Clock()
+        self.fps_cap = FPS_CAP
+        self.dirty, self.animating = True, False
+
+        # cached drawings
+
+        self.grid_layer, self.grid_layer_graph, self.grid_layer_key = None, None, None
+        self.air_layer, self.air_layer_graph = None, None
+        self.air_layer_version, self.air_layer_origin = -1, (0, 0)
+        self.air_blocked_edges = []
+        self.fonts = {}
+        self.text_cache, self.text_cache_size = OrderedDict(), 0
+        self.text_cache_budget = TEXT_CACHE_BUDGET
+        self.assets = AssetManager()
+
+        # different windows (the other menus are only created when first used)
 
         self.curr_menu = self.main_menu
 
+    def __getattr__(self, name: str) -> menu.Menu:
+        """ Create the menu with the given name the first time it is used, and keep it as
+        an attribute of the program, so that the time to create it (and to build its graph)
+        is only spent once a user actually visits it.
+        """
+        if name not in MENU_NAMES:
+            raise AttributeError(name)
+
+        start = time.perf_counter()
+        new_menu = create_menu(self, name)
+        setattr(self, name, new_menu)
+        self.startup_times[name] = time.perf_counter() - start
+        return new_menu
+
+    def startup_report(self) -> str:
+        """ Return a report of the time taken by every startup phase so far, and by the first
+        frame if it has been drawn.
+        """
+        lines = [f'{phase}: {seconds * 1000:.1f} ms' for phase, seconds in
+                 self.startup_times.items()]
+        if self.first_frame_time is not None:
+            status = 'over' if self.first_frame_time > STARTUP_BUDGET else 'within'
+            lines.append(f'first frame: {self.first_frame_time * 1000:.1f} ms ({status} the '
+                         f'{STARTUP_BUDGET * 1000:.0f} ms budget)')
+        return '\n'.join(lines)
+
     def program_menu_loop(self) -> None:
         """ The loop keeping the various program menus running through the attribute curr_menu
         until event.QUIT is executed.
@@ -173,12 +282,61 @@ class Program:
             self.catch_events_menu()  # receive user input
             self.window.blit(self.display, (0, 0))  # align menu display with window
             pygame.display.update()
+            self.end_frame()
+
+    def request_redraw(self) -> None:
+        """ Method marking the current menu as needing a new frame, for changes that do not
+        come from user input (entering a menu or finishing a computation).
+        """
+        self.dirty = True
+
+    def draw_progress(self, done: int, total: int) -> None:
+        """ Method showing a loading bar filled up to done out of total on the pygame window,
+        for loads that happen outside of a menu loop (such as building the snapshot of a
+        large maze file). The window is updated right away, and its events are pumped so that
+        it keeps responding while the load goes on.
+
+        Preconditions:
+            - 0 <= done <= total
+        """
+        self.display.fill(THECOLORS['lightgrey'])
+        self.draw_title_text(30, 'Loading...', (400, 370))
+        pygame.draw.rect(self.display, THECOLORS['gray11'], [150, 400, 500, 30], 2)
+        if total > 0:
+            pygame.draw.rect(self.display, THECOLORS['cyan'],
+                             [152, 402, 496 * done // total, 26])
+
+        self.window.blit(self.display, (0, 0))
+        pygame.display.update()
+        pygame.event.pump()
+
+    def end_frame(self) -> None:
+        """ Method to be called once a frame has been drawn, waiting as long as needed to keep
+        under self.fps_cap frames per second.
+        """
+        self.dirty = False
+        if self.first_frame_time is None:
+            self.first_frame_time = time.perf_counter() - self.start_time
+            if self.first_frame_time > STARTUP_BUDGET:
+                print('Slow startup:\n' + self.startup_report())
+        self.clock.tick(self.fps_cap)
 
     def catch_events_menu(self) -> None:
         """ Method in charge of interpreting the user input events in any of the pygame
         menus (this includes arrow keys, mouse input, and more).
+
+        When nothing is animating and nothing changed since the last frame, this method
+        sleeps until an event that can change the screen arrives, instead of letting the
+        menu loops draw the same frame over and over.
         """
-        for event in pygame.event.get():  # detect an input
+        events = pygame.event.get()
+        while not (self.dirty or self.animating) and \
+                all(event.type in PASSIVE_EVENTS for event in events):
+            events = [pygame.event.wait()] + pygame.event.get()
+
+        for event in events:  # detect an input
+            if event.type not in PASSIVE_EVENTS:
+                self.dirty = True
 
             # Quitting game
             if event.type == pygame.QUIT:
@@ -257,12 +415,44 @@ class Program:
         Preconditions:
             - len(ttd) <= 60
         """
-        font = pygame.font.SysFont(self.font_name, t_size)
-        text_surface = font.render(ttd, True, THECOLORS[colour])
+        text_surface = self.render_text(ttd, t_size, colour)
         text_rect = text_surface.get_rect()
         text_rect.center = (pos[0], pos[1])
         self.display.blit(text_surface, text_rect)
 
+    def get_font(self, size: int) -> pygame.font.Font:
+        """ Method returning the font of the program in the given size, which is only looked
+        up among the system fonts the first time it is asked for.
+        """
+        key = (self.font_name, size)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.SysFont(self.font_name, size)
+        return self.fonts[key]
+
+    def render_text(self, ttd: str, size: int, colour: str) -> pygame.Surface:
+        """ Method returning a surface with the given text rendered in the font of the
+        program, in the given size and colour.
+
+        Rendered surfaces are kept for reuse, so text drawn on every frame is only rendered
+        once. When they take up more than self.text_cache_budget bytes, the least recently
+        used ones are dropped.
+        """
+        key = (self.font_name, ttd, size, colour)
+        if key in self.text_cache:
+            self.text_cache.move_to_end(key)
+            return self.text_cache[key][0]
+
+        text_surface = self.get_font(size).render(ttd, True, THECOLORS[colour])
+        nbytes = text_surface.get_pitch() * text_surface.get_height()
+        self.text_cache[key] = (text_surface, nbytes)
+        self.text_cache_size += nbytes
+
+        while self.text_cache_size > self.text_cache_budget and len(self.text_cache) > 1:
+            _, (_, old_nbytes) = self.text_cache.popitem(last=False)
+            self.text_cache_size -= old_nbytes
+
+        return text_surface
+
     ##################################################################
     # methods specific to open sandbox implementation SIMPLE PROGRAM #
     ##################################################################
@@ -272,6 +462,11 @@ class Program:
         the a standard graph based on the coordinates of the vertices and the overall
         size of the grid.
 
+        The grid is kept drawn in the off-screen self.grid_layer, where only the cells whose
+        state changed since the last frame (as recorded by the graph) are painted again, and
+        which is then drawn on the display with a single blit. The whole layer is only painted
+        when a different graph or grid size is drawn.
+
         Preconditions:
             - 5 <= grid_dim[0] <= 20
             - 5 <= grid_dim[1] <= 20
@@ -279,13 +474,30 @@ class Program:
         local_width = int((WINDOW_SIZE[0] - 100) / grid_dim[0])
         local_height = int((WINDOW_SIZE[1] - 110) / grid_dim[1])
 
-        for vertex in graph.get_vertices():
-            ttd = str(vertex.pos)
-            grid_coords = (int((vertex.pos[0] * local_width) + 50),
-                           int((vertex.pos[1] * local_height) + 100))
-            colour = get_state_colour(vertex.state)
-
-            self.draw_cell(ttd, grid_coords, colour, grid_dim, 3, show_text)
+        if self.grid_layer is None or self.grid_layer_graph is not graph \
+                or self.grid_layer_key != (grid_dim, show_text):
+            # the layer is transparent wherever there is no cell, like the gaps between cells
+            self.grid_layer = pygame.Surface((grid_dim[0] * local_width,
+                                              grid_dim[1] * local_height), pygame.SRCALPHA)
+            self.grid_layer_graph, self.grid_layer_key = graph, (grid_dim, show_text)
+            graph.take_state_changes()
+            changed = graph.vertices
+        else:
+            changed = graph.take_state_changes()
+
+        for pos in changed:
+            # each cell owns the area up to the next cell, which is cleared and then painted
+            # again without touching the other cells
+            area = pygame.Rect(pos[0] * local_width, pos[1] * local_height,
+                               local_width, local_height)
+            self.grid_layer.fill((0, 0, 0, 0), area)
+            self.grid_layer.set_clip(area)
+            colour = get_state_colour(graph.vertices[pos].state)
+            self.draw_cell(str(pos), area.topleft, colour, grid_dim, 3, show_text,
+                           self.grid_layer)
+
+        self.grid_layer.set_clip(None)
+        self.display.blit(self.grid_layer, (50, 100))
 
     ################################################################
     # methods specific to open sandbox implementation MAZE PROGRAM #
@@ -346,6 +558,9 @@ class Program:
         local_width = int((800 - 100) / grid_dim[0])
         local_height = int((810 - 110) / grid_dim[1])
         for vertex in graph.get_vertices():
+            if vertex.menu_pos is None:
+                continue  # the vertex did not fit in the menu grid
+
             if len(str(vertex.name)) > 8:
                 ttd = str(vertex.name)[0: 8] + '.'
             else:  # vertex name fits in box size for the standard 8 by 10 grid (and 4 by 5)
@@ -363,55 +578,92 @@ class Program:
         displaying the correct colours and edge and vertex states according to the
         input graph (as modified in the menu window by the user for this specific
         implementation).
+
+        The edges between vertices that are not blocked are kept drawn in the off-screen
+        self.air_layer, each edge drawn once, and the layer is only drawn again when the graph
+        or its blocked vertices change. Every frame blits the layer, and then draws the edges
+        of the blocked vertices and the vertices themselves on top.
         """
-        for vertex in graph.get_vertices():
-            colour1 = get_state_colour(vertex.state)
-            pygame.draw.circle(self.display, colour1, vertex.pos, 8)
+        if self.air_layer is None or self.air_layer_graph is not graph \
+                or self.air_layer_version != graph.version:
+            self.draw_air_layer(graph)
 
-            for neighbour in vertex.neighbours:
-                colour2 = get_state_colour(neighbour.state)
+        self.display.blit(self.air_layer, self.air_layer_origin)
 
-                # standard edge colour for two connected vertices
-                edge_colour = 'black'
+        for pos1, pos2 in self.air_blocked_edges:
+            pygame.draw.line(self.display, 'red', pos1, pos2)
 
+        for vertex in graph.vertices.values():
+            pygame.draw.circle(self.display, get_state_colour(vertex.state), vertex.pos, 8)
+
+    def draw_air_layer(self, graph: WeightedGraph) -> None:
+        """ Draw self.air_layer again for the given graph: a surface just big enough for the
+        vertex positions of the graph, holding the edges (in black) between the vertices that
+        are not blocked, and transparent everywhere else. Also list the other edges of the
+        graph in self.air_blocked_edges.
+
+        The transparency comes from a colour key rather than per-pixel alpha, since the layer
+        is mostly empty and run-length encoded colour keyed surfaces are much faster to blit.
+        """
+        positions = [vertex.pos for vertex in graph.vertices.values()]
+        left = int(min((pos[0] for pos in positions), default=0))
+        top = int(min((pos[1] for pos in positions), default=0))
+        right = int(max((pos[0] for pos in positions), default=0))
+        bottom = int(max((pos[1] for pos in positions), default=0))
+
+        self.air_layer = pygame.Surface((right - left + 1, bottom - top + 1))
+        self.air_layer.fill(AIR_LAYER_KEY)
+        self.air_layer_graph, self.air_layer_version = graph, graph.version
+        self.air_layer_origin = (left, top)
+        self.air_blocked_edges = []
+
+        for v1, v2, _ in graph.get_edges():
+            if v1.state == 'blocked' or v2.state == 'blocked':
                 # if any of the two vertices is blocked we block the edge
-                if colour1 == 'red' or colour2 == 'red':
-                    edge_colour = 'red'
+                self.air_blocked_edges.append((v1.pos, v2.pos))
+            else:
+                pygame.draw.line(self.air_layer, 'black', (v1.pos[0] - left, v1.pos[1] - top),
+                                 (v2.pos[0] - left, v2.pos[1] - top))
 
-                # draw the line connecting the two, these lines are sometimes overwritten since
-                # edges are symmetric, but this doesn't affect the program
-                pygame.draw.line(self.display, edge_colour, vertex.pos, neighbour.pos)
+        self.air_layer.set_colorkey(AIR_LAYER_KEY, pygame.RLEACCEL)
 
     #################################################
     # methods shared across various implementations #
     ##################################################
 
     def draw_cell(self, text: str, pos: tuple[int, int], colour: str,
-                  grid_dim: tuple[int, int], offset: int, show_text: bool) -> None:
+                  grid_dim: tuple[int, int], offset: int, show_text: bool,
+                  surface: Optional[pygame.Surface] = None) -> None:
         """ Draw a cell on the correct window at the input position with all other
         input characteristics. Each cell represents a vertex in the standard graphs
         being used in the simple_program and maze implementations, or just a cell in
         a non-graph-related grid like the one for the air program menu.
 
+        The cell is drawn on the given surface instead of the display if one is given.
+
         Preconditions:
             - 0 <= pos[0] <= 800
             - 0 <= pos[1] <= 810
         """
+        if surface is None:
+            surface = self.display
+
         local_width = int((WINDOW_SIZE[0] - 100) / grid_dim[0])
         local_height = int((WINDOW_SIZE[1] - 110) / grid_dim[1])
 
         text_size = get_grid_text_size(grid_dim)
 
         # draw rectangle where node is contained
-        pygame.draw.rect(self.display, colour,
+        pygame.draw.rect(surface, colour,
                          pygame.Rect(pos, (local_width - offset, local_height - offset)))
         if show_text:
             # draw text on the rectangle's position
             text_pos = (pos[0] + 5, pos[1] + 10)
-            self.draw_grid_text(text_size, text, text_pos, grid_dim)
+            self.draw_grid_text(text_size, text, text_pos, grid_dim, surface)
 
     def draw_grid_text(self, text_size: int, ttd: str, pos: tuple[int, int],
-                       grid_dim: tuple[int, int]) -> None:
+                       grid_dim: tuple[int, int], surface: Optional[pygame.Surface] = None) \
+            -> None:
         """Draw the given text on the pygame screen at the given position (inside grids).
         Unlike with title text, the colour of this text is not open to customization since
         the grid text always needs good contrast with the regular cell colours, and must
@@ -419,23 +671,56 @@ class Program:
 
         - ttd: the text to be displayed
 
+        The text is drawn on the given surface instead of the display if one is given.
+
         Preconditions:
             - 0 <= pos[0] <= 800
             - 0 <= pos[1] <= 810
         """
+        if surface is None:
+            surface = self.display
+
         local_width = int((WINDOW_SIZE[0] - 100) / grid_dim[0])
         local_height = int((WINDOW_SIZE[1] - 100) / grid_dim[1])
 
-        font = pygame.font.SysFont(self.font_name, text_size)
-        text_surface = font.render(ttd, True, THECOLORS['antiquewhite'])
-        self.display.blit(text_surface,
-                          pygame.Rect(pos, (pos[0] + local_width, pos[1] + local_height)))
+        text_surface = self.render_text(ttd, text_size, 'antiquewhite')
+        surface.blit(text_surface,
+                     pygame.Rect(pos, (pos[0] + local_width, pos[1] + local_height)))
 
 
 ###################
 # Other functions #
 ###################
 
+def create_menu(program: Program, name: str) -> menu.Menu:
+    """ Returns a new menu of the given program, which is to be stored in the program
+    attribute of the given name. The program runs start with default graphs, which are
+    overwritten when the user enters them from their menu.
+
+    Preconditions:
+        - name in MENU_NAMES
+    """
+    if name == 'main_menu':
+        return menu.MainMenu(program)
+    elif name == 'simple_program_menu':
+        return menu.SpMenu(program)
+    elif name == 'simple_program_run':
+        return menu.SimpleProgramRun(program, (5, 5))
+    elif name == 'maze_program_menu':
+        return menu.MazeProgramMenu(program)
+    elif name == 'maze_program_run':
+        return menu.MazeProgramRun(program, 'datasets/default_maze.csv', (5, 5))
+    elif name == 'air_routes_program_menu':
+        return menu.AirProgramMenu(program)
+    elif name == 'air_routes_program_run':
+        # the run shows the graph set up in its menu
+        return menu.AirProgramRun(program, program.air_routes_program_menu.graph)
+    elif name == 'air_cost_program_menu':
+        return menu.AirCostProgramMenu(program)
+    else:  # name == 'air_cost_program_run'
+        return menu.AirCostProgramRun(program, program.air_cost_program_menu.graph)
+
+
 def get_state_colour(state: str) -> str:
     """" Returns the colour name (which forms part of the THECOLORS list) to represent
     a vertex's colour in a grid.
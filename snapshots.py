@@ -0,0 +1,219 @@
+"""CSC111 Winter 2021 Course Project: Graph Snapshots
+
+Authors: Michele Massa, Nischal Nair, Nathan Zavys-Cox
+
+Description: this module contains the binary snapshot format used to save the graphs built
+from our csv datasets, so that they only have to be parsed once. A snapshot file holds a
+header (format version, kind of graph and checksum of the csv files it was built from), a
+table of the numpy arrays it stores, the arrays themselves and a string table with the names
+of the vertices. Snapshots are memory mapped when they are read, so their arrays are views of
+the file rather than copies of it, and a snapshot is rebuilt automatically whenever one of
+the csv files it was built from changes.
+
+This file is copyright (c) 2021 Michele Massa, Nischal Nair and Nathan Zavys-Cox.
+"""
+from typing import Callable, Optional
+import hashlib
+import mmap
+import os
+import struct
+
+import numpy as np
+
+
+#############
+# CONSTANTS #
+#############
+
+# the directory snapshots of the datasets are saved in
+SNAPSHOT_DIR = 'datasets/snapshots'
+
+# the first bytes of every snapshot file, and the version of the format it is written in
+# (snapshots written in any other version are rebuilt)
+MAGIC = b'CSC111SN'
+FORMAT_VERSION = 1
+
+# the header of a snapshot: magic, format version, kind, source checksum, number of arrays,
+# followed by one array entry per array: name, dtype, offset in the file, number of items
+HEADER = struct.Struct('<8sI16s32sI')
+ARRAY_ENTRY = struct.Struct('<16s8sQQ')
+
+# arrays are stored at offsets that are multiples of this, so every dtype is aligned
+ALIGNMENT = 8
+
+
+###########
+# Classes #
+###########
+
+
+class Snapshot:
+    """ The contents of a snapshot: the arrays describing a graph, and the names of its
+    vertices. The arrays of a snapshot read from a file are read-only views of the file.
+
+    Instance Attributes:
+        - kind: the kind of graph saved in this snapshot (e.g. 'weighted' or 'grid')
+        - checksum: the checksum of the csv files this snapshot was built from
+        - arrays: dictionary mapping the name of every saved array to the array
+        - names: the names of the vertices of the graph, in the order of its vertex arrays
+
+    Representation Invariants:
+        - len(self.kind.encode()) <= 16
+        - len(self.checksum) == 32
+        - all(len(name.encode()) <= 16 for name in self.arrays)
+        - all(array.ndim == 1 for array in self.arrays.values())
+    """
+    kind: str
+    checksum: bytes
+    arrays: dict[str, np.ndarray]
+    names: list[str]
+
+    def __init__(self, kind: str, checksum: bytes, arrays: dict[str, np.ndarray],
+                 names: list[str]) -> None:
+        """ Initialize a snapshot with the given contents.
+        """
+        self.kind = kind
+        self.checksum = checksum
+        self.arrays = arrays
+        self.names = names
+
+
+####################
+# Helper Functions #
+####################
+
+
+def source_checksum(sources: list[str]) -> bytes:
+    """ Return the checksum of the contents of the given files, in order.
+
+    >>> source_checksum(['datasets/cities.csv']) == source_checksum(['datasets/cities.csv'])
+    True
+    >>> source_checksum(['datasets/cities.csv']) == source_checksum(['datasets/countries.csv'])
+    False
+    """
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update(struct.pack('<Q', os.path.getsize(source)))
+        with open(source, 'rb') as file:
+            for chunk in iter(lambda: file.read(2 ** 20), b''):
+                digest.update(chunk)
+    return digest.digest()
+
+
+def snapshot_path(source: str) -> str:
+    """ Return the path of the file the snapshot built from the given source file is saved in.
+
+    >>> snapshot_path('datasets/cities.csv')
+    'datasets/snapshots/cities.snap'
+    """
+    return os.path.join(SNAPSHOT_DIR, os.path.splitext(os.path.basename(source))[0] + '.snap')
+
+
+def write_snapshot(path: str, snapshot: Snapshot) -> None:
+    """ Save snapshot in the file at path, creating its directory if needed.
+
+    The snapshot is first written to a temporary file which then replaces the file at path,
+    so that a snapshot that is being read is never overwritten halfway.
+    """
+    name_data = [name.encode() for name in snapshot.names]
+    name_offsets = np.zeros(len(name_data) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in name_data], out=name_offsets[1:])
+    arrays = {**snapshot.arrays,
+              'name_data': np.frombuffer(b''.join(name_data), dtype=np.uint8),
+              'name_offsets': name_offsets}
+
+    offset = HEADER.size + ARRAY_ENTRY.size * len(arrays)
+    entries, placed = [], []
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        offset += -offset % ALIGNMENT
+        entries.append(ARRAY_ENTRY.pack(name.encode(), array.dtype.str.encode(), offset,
+                                        array.size))
+        placed.append((offset, array))
+        offset += array.nbytes
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, snapshot.kind.encode(),
+                               snapshot.checksum, len(arrays)))
+        file.write(b''.join(entries))
+        for offset, array in placed:
+            file.write(bytes(offset - file.tell()))
+            file.write(array.tobytes())
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path: str) -> Optional[Snapshot]:
+    """ Return the snapshot saved in the file at path, memory mapping the file, or None if
+    there is no such file or it is not a valid snapshot of the current format version.
+    """
+    try:
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(buffer) < HEADER.size:
+        return None
+    magic, version, kind, checksum, count = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+
+    try:
+        arrays = {}
+        for i in range(count):
+            name, dtype, offset, size = ARRAY_ENTRY.unpack_from(
+                buffer, HEADER.size + i * ARRAY_ENTRY.size)
+            arrays[name.rstrip(b'\0').decode()] = np.frombuffer(
+                buffer, dtype=np.dtype(dtype.rstrip(b'\0').decode()), count=size, offset=offset)
+
+        name_data = arrays.pop('name_data').tobytes()
+        name_offsets = arrays.pop('name_offsets').tolist()
+        names = [name_data[start:end].decode()
+                 for start, end in zip(name_offsets, name_offsets[1:])]
+        kind = kind.rstrip(b'\0').decode()
+    except (KeyError, ValueError, struct.error):
+        return None  # the file was cut short or is corrupted
+
+    return Snapshot(kind, checksum, arrays, names)
+
+
+def load_snapshot(path: str, kind: str, sources: list[str],
+                  build: Callable[[], tuple[dict[str, np.ndarray], list[str]]]) -> Snapshot:
+    """ Return the snapshot of the given kind saved in the file at path, if it was built from
+    the current contents of the source files. Otherwise, build the (arrays, names) of a new
+    snapshot by calling build, save it at path and return it.
+
+    If the snapshot cannot be saved (e.g. the snapshot directory is read-only), the new
+    snapshot is returned all the same, and will be built again next time.
+    """
+    checksum = source_checksum(sources)
+    snapshot = read_snapshot(path)
+    if snapshot is not None and snapshot.kind == kind and snapshot.checksum == checksum:
+        return snapshot
+
+    arrays, names = build()
+    snapshot = Snapshot(kind, checksum, arrays, names)
+    try:
+        write_snapshot(path, snapshot)
+    except OSError:
+        return snapshot
+
+    return read_snapshot(path) or snapshot
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136', 'E9999', 'E9998', 'R0913'],
+        'extra-imports': [],
+        'max-nested-blocks': 5
+    })
+
+    import python_ta.contracts
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()